@@ -0,0 +1,72 @@
+"""
+Peak memory of building the simulated panel as a list of dicts (previous approach)
+versus the preallocated columnar PanelBuffer.
+
+Run from the root folder:
+    python -m benchmarks.bench_panel_memory --containers 10000 --days 365
+"""
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from components.PanelBuffer import PanelBuffer
+
+
+def build_with_dicts(num_containers, days, start_date):
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    actual_dates = [start + timedelta(days=i) for i in range(days)]
+    data = []
+    for container_id in range(1, num_containers + 1):
+        for actual_date in actual_dates:
+            data.append({
+                "ContainerID": container_id,
+                "ActualDate": actual_date,
+                "StartingDate": actual_date,
+                "RecollectingDate": None,
+                "IsLost": 0,
+                "DayTrip": 1,
+                "TripID": 1,
+                "IsFakeLost": 0
+            })
+    return pd.DataFrame(data)
+
+
+def build_with_buffer(num_containers, days, start_date):
+    buffer = PanelBuffer(num_containers, days)
+    buffer.starting_day[:] = buffer.actual_day
+    buffer.day_trip[:] = 1
+    buffer.trip_id[:] = 1
+    return buffer.to_frame(start_date)
+
+
+def peak_memory(builder, *args):
+    """
+    Returns the peak of the traced memory in MB while running the builder.
+    """
+    tracemalloc.start()
+    df = builder(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 ** 2, df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--containers", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    rows = args.containers * args.days
+    print(f"Panel of {rows:,} rows ({args.containers} containers x {args.days} days)")
+    for name, builder in (("list of dicts", build_with_dicts), ("PanelBuffer", build_with_buffer)):
+        peak, frame = peak_memory(builder, args.containers, args.days, "2023-01-01")
+        print(f"{name:>14}: peak {peak:10.1f} MB, final DataFrame {frame:8.1f} MB")
+
+    buffer = PanelBuffer(args.containers, args.days)
+    print(f"{'buffer arrays':>14}: {buffer.nbytes / 1024 ** 2:10.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Timing and peak memory of the main steps of the app (simulation, fake lost correction,
+summary table, trip aggregation, Kaplan-Meier fit, projection and histogram figure) for several numbers of containers.
+
+The results are saved as JSON and can be compared with a previous run: the benchmarks slower
+(or using more memory) than the baseline by more than the tolerance are flagged and the exit code is 1.
+
+Run from the root folder:
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 --output benchmarks/results.json
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 --baseline benchmarks/baseline.json
+
+benchmarks/baseline.json is a reference run (1k and 10k containers, 1 CPU), timings are only
+comparable between runs on the same machine.
+
+The steps working on the daily panel (num_containers x days rows) are skipped for the sizes
+above --max-panel-rows, the trip level steps run at every size.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from components.DataSimulator import DataSimulator
+from components.DataTransformer import DataTransformer
+from components.Modeler import Modeler
+from components.SurvivalEstimator import KaplanMeierEstimator
+from utils import graph_maker, math_functions
+
+
+class BenchmarkContext:
+    """
+    Data shared by the benchmarks of one size, built the first time it is needed.
+    """
+
+    def __init__(self, num_containers, days, min_trip_days):
+        self.num_containers = num_containers
+        self.days = days
+        self.min_trip_days = min_trip_days
+        self._panel = None
+        self._trips = None
+        self._modeler = None
+
+    def simulator(self):
+        return DataSimulator(self.num_containers, self.days, self.min_trip_days)
+
+    @property
+    def panel(self):
+        if self._panel is None:
+            simulator = self.simulator()
+            self._panel = (simulator.simulate_container_data(), simulator.eval_metrics)
+        return self._panel
+
+    @property
+    def trips(self):
+        if self._trips is None:
+            self._trips = Modeler.from_trip_table(self.simulator().simulate_trip_table(), prob_in_trip=1).df
+        return self._trips
+
+    @property
+    def modeler(self):
+        if self._modeler is None:
+            self._modeler = Modeler(self.panel[0], prob_in_trip=1)
+        return self._modeler
+
+    def fresh_panel(self):
+        """
+        Copy of the panel, for the benchmarks that modify it in place.
+        """
+        return self.panel[0].copy()
+
+
+def prepare_update_fake_lost(context):
+    return context.simulator(), context.fresh_panel()
+
+
+# name: (uses the daily panel, prepare(context) -> arguments (not timed), run(*arguments))
+BENCHMARKS = {
+    "simulate_container_data": (True, lambda context: (context.simulator(),), lambda simulator: simulator.simulate_container_data()),
+    "simulate_trip_table": (False, lambda context: (context.simulator(),), lambda simulator: simulator.simulate_trip_table()),
+    "update_fake_lost": (True, prepare_update_fake_lost, lambda simulator, df: simulator.update_fake_lost(df)),
+    "create_summary_table": (True, lambda context: (DataTransformer(context.panel[0]), context.panel[1]),
+                             lambda transformer, metrics: transformer.create_summary_table(metrics)),
+    "prepare_data_for_analysis": (True, lambda context: (context.modeler,), lambda modeler: modeler.prepare_data_for_analysis()),
+    "kaplan_meier_fit": (False, lambda context: (context.trips,),
+                         lambda trips: KaplanMeierEstimator().fit(trips["DayTrip"], trips["IsLost"])),
+    "calculate_available_containers": (False, lambda context: (context.num_containers, context.days),
+                                       lambda containers, days: math_functions.calculate_available_containers(containers, days, 0.001)),
+    "plot_histogram_with_thresholds": (False, lambda context: (context.trips["DayTrip"], context.min_trip_days),
+                                       lambda durations, threshold: graph_maker.plot_histogram_with_thresholds(durations, threshold)),
+}
+
+
+def measure(prepare, run, context, repeats):
+    """
+    Times a benchmark and measures its peak memory in a separate traced run.
+    One untimed run comes first, so one-off costs (imports, first call setup) are not timed.
+
+    Returns:
+        dict: Best and mean time in seconds and peak traced memory in MB.
+    """
+    run(*prepare(context))
+
+    times = []
+    for _ in range(repeats):
+        arguments = prepare(context)
+        start = time.perf_counter()
+        run(*arguments)
+        times.append(time.perf_counter() - start)
+
+    arguments = prepare(context)
+    tracemalloc.start()
+    run(*arguments)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": min(times), "mean_seconds": float(np.mean(times)), "peak_mb": peak / 1024 ** 2}
+
+
+def run_benchmarks(sizes, days=365, min_trip_days=20, repeats=3, max_panel_rows=40_000_000, names=None):
+    """
+    Runs the benchmarks for every number of containers.
+
+    Parameters:
+        sizes (list of int): Numbers of containers.
+        days (int): Days of the simulations.
+        min_trip_days (int): Threshold of the simulations.
+        repeats (int): Timed runs of each benchmark, the best one is reported.
+        max_panel_rows (int): Largest daily panel built, the panel benchmarks are skipped above it.
+        names (list of str, optional): Benchmarks to run, all by default.
+
+    Returns:
+        dict: 'metadata' of the run and 'results', one entry per benchmark and size.
+    """
+    results = []
+    for num_containers in sizes:
+        context = BenchmarkContext(num_containers, days, min_trip_days)
+        for name, (uses_panel, prepare, run) in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+            entry = {"benchmark": name, "containers": num_containers, "days": days}
+            if uses_panel and num_containers * days > max_panel_rows:
+                entry["skipped"] = f"panel of {num_containers * days:,} rows above --max-panel-rows"
+            else:
+                entry.update(measure(prepare, run, context, repeats))
+            results.append(entry)
+            print(format_entry(entry), flush=True)
+
+    metadata = {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeats": repeats,
+    }
+    return {"metadata": metadata, "results": results}
+
+
+def compare_with_baseline(results, baseline, tolerance=0.2, min_seconds=0.005):
+    """
+    Compares the results with a baseline run.
+
+    Parameters:
+        results (dict): Output of run_benchmarks.
+        baseline (dict): Output of a previous run_benchmarks.
+        tolerance (float): Allowed relative increase of the time and of the peak memory.
+        min_seconds (float): Slowdowns smaller than this are timer noise and are not flagged
+                             (neither are memory increases below 1 MB).
+
+    Returns:
+        pd.DataFrame: One row per benchmark and size present in both runs, with the time and memory
+                      ratios (current / baseline) and the 'regression' flag.
+    """
+    columns = ["benchmark", "containers", "seconds", "peak_mb"]
+    current = pd.DataFrame(results["results"]).reindex(columns=columns).dropna()
+    previous = pd.DataFrame(baseline["results"]).reindex(columns=columns).dropna()
+
+    comparison = current.merge(previous, on=["benchmark", "containers"], suffixes=("", "_baseline"))
+    comparison["time_ratio"] = comparison["seconds"] / comparison["seconds_baseline"]
+    comparison["memory_ratio"] = comparison["peak_mb"] / comparison["peak_mb_baseline"]
+    slower = (comparison["time_ratio"] > 1 + tolerance) & (comparison["seconds"] - comparison["seconds_baseline"] > min_seconds)
+    larger = (comparison["memory_ratio"] > 1 + tolerance) & (comparison["peak_mb"] - comparison["peak_mb_baseline"] > 1)
+    comparison["regression"] = slower | larger
+    return comparison
+
+
+def format_entry(entry):
+    label = f"{entry['benchmark']:>30} {entry['containers']:>9,}"
+    if "skipped" in entry:
+        return f"{label}  skipped: {entry['skipped']}"
+    return f"{label}  {entry['seconds'] * 1000:10.1f} ms  peak {entry['peak_mb']:9.1f} MB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--min-trip-days", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-panel-rows", type=int, default=40_000_000)
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run, all by default.")
+    parser.add_argument("--output", help="JSON file where the results are saved.")
+    parser.add_argument("--baseline", help="JSON file of a previous run to compare with.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before flagging.")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.days, args.min_trip_days, args.repeats, args.max_panel_rows, args.benchmarks)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            comparison = compare_with_baseline(results, json.load(file), args.tolerance)
+        print(comparison[["benchmark", "containers", "time_ratio", "memory_ratio", "regression"]].to_string(index=False))
+        if comparison["regression"].any():
+            print(f"{comparison['regression'].sum()} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
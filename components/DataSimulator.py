@@ -1,7 +1,13 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from utils import math_functions
+from concurrent.futures import ProcessPoolExecutor
+from utils import math_functions, panel_io
+from components.PanelBuffer import PanelBuffer
+from components.SimulationCheckpoint import SimulationCheckpoint
+
+# Version of the simulated output, part of the keys of the result cache (see utils.result_cache).
+# Bump it whenever the same parameters give a different panel or different metrics.
+SIMULATION_VERSION = 1
 
 class DataSimulator:
     """
@@ -9,7 +15,11 @@ class DataSimulator:
     whether they are lost, and calculating the total stock of non-lost containers.
     """
 
-    def __init__(self, num_containers, days, min_trip_days, scenario = 1, perc_trips_observed = 1, start_date="2023-01-01"):
+    # Number of containers of each shard, every shard has its own random stream.
+    # The shards do not depend on the number of workers, so neither does the output.
+    shard_size = 5000
+
+    def __init__(self, num_containers, days, min_trip_days, scenario = 1, perc_trips_observed = 1, start_date="2023-01-01", seed = 42):
         """
         Initializes the simulation parameters.
 
@@ -18,6 +28,7 @@ class DataSimulator:
             days (int): Number of days to simulate from the start date.
             min_trip_days (int): Min days expected for each trip.
             start_date (str): Default start date value for simulated data.
+            seed (int): Seed of the random numbers of the simulation.
         """
         self.num_containers = num_containers
         self.days = days
@@ -25,7 +36,16 @@ class DataSimulator:
         self.start_date = start_date
         self.scenario = scenario
         self.perc_trips_observed = perc_trips_observed
+        self.seed = seed
         self.eval_metrics = None
+        # Total stock of each day (pd.Series indexed by ActualDate), set by the simulation
+        self.daily_stock = None
+        # True positives and false positives of the lost classification
+        self.lost_classification = None
+        # State to extend the simulation, set by the vectorized engine of simulate_container_data
+        self.checkpoint = None
+        # Raw trips of the last simulation (see simulate_raw_trips), to relabel them for other thresholds
+        self.raw_trips = None
 
     def update_fake_lost(self, df):
         """
@@ -38,16 +58,14 @@ class DataSimulator:
         Returns:
             pd.DataFrame: Updated DataFrame with Is Fake Lost values.
         """
-        # Filter rows where recollecting date appears after min_trip_days
-        fake_lost_trips = df[(df["RecollectingDate"].notnull()) & (df["IsLost"] == 1)][["ContainerID", "TripID"]].drop_duplicates()
+        # Rows where recollecting date appears after min_trip_days
+        lost_recollection = (df["RecollectingDate"].notnull()) & (df["IsLost"] == 1)
 
-        # Iterate through each misclassified trip
-        for _, row in fake_lost_trips.iterrows():
-            container_id = row["ContainerID"]
-            trip_number = row["TripID"]
+        # Flag every row of the misclassified trips in a single group-level pass
+        fake_lost_trip = lost_recollection.groupby([df["ContainerID"], df["TripID"]], dropna=False, sort=False).transform("max")
 
-            # Update Is Fake Lost for all rows in the same trip but ensure only Lost rows are updated
-            df.loc[(df["ContainerID"] == container_id) & (df["TripID"] == trip_number) & (df["IsLost"] == 1), "IsFakeLost"] = 1
+        # Update Is Fake Lost for all rows in the same trip but ensure only Lost rows are updated
+        df.loc[fake_lost_trip & (df["IsLost"] == 1), "IsFakeLost"] = 1
         return df
 
     def reassign_lost_value(self, df):
@@ -59,26 +77,53 @@ class DataSimulator:
 
         return df
     
-    def calculate_fake_lost_percentage(self,df):
+    def calculate_fake_lost_percentage(self, df, thresholds=None):
         """
-        Calculates the percentage of fake lost containers in the DataFrame.
+        Calculates the precision and the F1 score of the lost classification of the panel (eval_metrics).
+        The lost days are counted from the flag columns, the panel is not copied.
 
         Args:
             df (pd.DataFrame): The DataFrame containing simulated container data.
+            thresholds (array-like, optional): Values of min_trip_days to evaluate on the trips of the panel.
 
         Returns:
-            float: The percentage of fake lost containers.
+            pd.DataFrame: When thresholds are given, the precision/F1 table of threshold_curve computed
+                          from the panel, None otherwise.
         """
-        data = df.copy()
-        #print(data.columns)
-                # Calculate the percentage of incorrectly classified lost days
-        data["UniqueTripID"] = data["ContainerID"].astype(str) + "_" + data["TripID"].astype(str)
+        tp, fp = self.count_lost_classification(df)
+        self.set_eval_metrics(tp, fp)
+        if thresholds is not None:
+            return self.threshold_curve(thresholds, df)
+
+    def count_lost_classification(self, df):
+        """
+        Counts the lost days correctly (true positives) and incorrectly (false positives)
+        classified as lost. The counts of several chunks of the panel can be summed.
+
+        Args:
+            df (pd.DataFrame): The DataFrame containing simulated container data.
 
-        groupby_trip_lost_df = data[data["IsLost"] == 1][["UniqueTripID", "IsFakeLost"]]
-        #precision_treshold = groupby_trip_lost_df["IsFakeLost"].mean()
+        Returns:
+            tuple: True positives and false positives.
+        """
+        # Calculate the percentage of incorrectly classified lost days,
+        # every lost day counts so no trip key is needed
+        is_lost = df["IsLost"].to_numpy() == 1
+        is_fake_lost = df["IsFakeLost"].to_numpy()
 
-        tp = len(groupby_trip_lost_df[groupby_trip_lost_df["IsFakeLost"] == 0])
-        fp = len(groupby_trip_lost_df[groupby_trip_lost_df["IsFakeLost"] == 1])
+        tp = int(np.count_nonzero(is_lost & (is_fake_lost == 0)))
+        fp = int(np.count_nonzero(is_lost & (is_fake_lost == 1)))
+        return tp, fp
+
+    def set_eval_metrics(self, tp, fp):
+        """
+        Stores the precision and the F1 score of the lost classification in eval_metrics.
+
+        Args:
+            tp (int): True positives.
+            fp (int): False positives.
+        """
+        self.lost_classification = (tp, fp)
 
         # we cannot directly observe the false negative cause we don't know the exact moment of losing the container we assume this value to be 0
         fn = 0
@@ -99,46 +144,392 @@ class DataSimulator:
             "F1_Score_threshold": f1_score
         }
 
+    def get_recollecting_distribution(self):
+        """
+        Returns the log normal distribution used to model the recollecting probability
+        for the scenario of the simulator.
 
-    def simulate_container_data(self):
+        Returns:
+            pd.DataFrame: DataFrame with "Duration", "PDF" and "CDF" columns.
+        """
+        # for the main scenario we are using the default parameters of the log normal
+        # distribution in order to model the recollecting probability.
+        if self.scenario == 1:
+            return math_functions.get_lognorm_distribution(mean= 3.5 , sigma = 0.3)
+
+        # the underlying probability distribution in case of the second scenario has a different shape
+        # reflecting that the probability of experimenting a recollecting event it's less concentered around the mean ad it's lagged
+        adjusted_mu ,adjusted_sigma =  math_functions.calculate_adjusted_params(perc_trips_observed = self.perc_trips_observed , mu = 3.5, sigma = 0.3)
+        return math_functions.get_lognorm_distribution(mean= adjusted_mu , sigma = adjusted_sigma)
+
+    def simulate_container_data(self, engine="vectorized", n_workers=None):
         """
         Simulates the container data and returns it as a DataFrame.
 
+        Args:
+            engine (str): "loop" walks every container and day in Python,
+                          "vectorized" advances all the containers one day at a time with NumPy arrays.
+                          Both engines consume the same random numbers and return the same data.
+            n_workers (int, optional): The containers are split in shards of shard_size containers,
+                          each one with its own random stream spawned from the seed (see _get_shards).
+                          When greater than 1, the shards are simulated by a pool of n_workers processes
+                          with the vectorized engine. The output is the same for any number of workers,
+                          including the default single process mode.
+
         Returns:
             pd.DataFrame: Simulated container data including container ID, actual date,
                           starting date, recollecting date, lost status, total stock, day trip, trip number, and fake lost flag.
         """
-        # Define the starting date for the simulation
-        start_date = datetime.strptime(self.start_date, "%Y-%m-%d")
-        actual_dates = [start_date + timedelta(days=i) for i in range(self.days)]
-        np.random.seed(42)
-        # for the main scenario we are using the default parameters of the log normal
-        # distribution in order to model the recollecting probability.
-        if self.scenario == 1:
-            log_norm_dist =    math_functions.get_lognorm_distribution(mean= 3.5 , sigma = 0.3)
+        if engine not in ("loop", "vectorized"):
+            raise ValueError(f"Unknown engine '{engine}', expected 'loop' or 'vectorized'.")
+        if n_workers is not None and engine != "vectorized":
+            raise ValueError("The parallel mode is only available with the vectorized engine.")
+
+        log_norm_dist = self.get_recollecting_distribution()
+
+        hazard_table = math_functions.HazardTable(log_norm_dist)
+        self.checkpoint = None
+        self.raw_trips = None
+
+        if engine == "loop":
+            df = self._simulate_loop(hazard_table)
+        else:
+            df = self._simulate_sharded(hazard_table, 1 if n_workers is None else n_workers)
+
+        return self._finalize_panel(df)
+
+    def extend(self, df, days):
+        """
+        Extends a panel simulated with the vectorized engine of simulate_container_data by some
+        more days, resuming every container and random stream from self.checkpoint.
+        The result is the panel that simulating the whole horizon would return,
+        with the rows of the new days appended at the end of the panel instead of next to the
+        earlier rows of their container.
+
+        The simulation work scales with the added days (see extend_segments). df is not modified:
+        the returned panel is a new DataFrame, so every earlier row is copied once. Use
+        extend_segments to keep the panel as a list of segments and avoid that copy.
+
+        Args:
+            df (pd.DataFrame): Panel returned by simulate_container_data or by the last extend,
+                               with its rows in the same order.
+            days (int): Number of days to add.
+
+        Returns:
+            pd.DataFrame: The extended panel.
+        """
+        self._check_checkpoint(len(df))
+        new_rows, patches = self._simulate_extension(days, len(df))
+        # the earlier rows keep their positions in the extended panel, the copy made by concat is patched
+        panel = pd.concat([df, new_rows], ignore_index=True)
+        for positions, column, values in patches:
+            patch_rows([panel], positions, column, values)
+        return panel
+
+    def extend_segments(self, segments, days):
+        """
+        Extends a panel stored as a list of DataFrames (e.g. the panel of simulate_container_data
+        followed by the rows of each extension) without copying it: the rows of the new days are
+        appended to the list as a new DataFrame.
+
+        Only the new days are simulated. The earlier rows are updated in place only for the trips
+        running at the checkpoint that are recollected after being classified as lost, and the
+        TotalStock of the days where they were lost, so the cost depends on the added days and
+        not on the days already simulated.
+
+        Args:
+            segments (list of pd.DataFrame): The panel split in consecutive blocks of rows, with
+                                             its rows in the order of the simulation, modified in place.
+            days (int): Number of days to add.
+
+        Returns:
+            list of pd.DataFrame: segments, with the new rows appended.
+        """
+        rows = sum(len(segment) for segment in segments)
+        self._check_checkpoint(rows)
+        new_rows, patches = self._simulate_extension(days, rows)
+        for positions, column, values in patches:
+            patch_rows(segments, positions, column, values)
+        segments.append(new_rows)
+        return segments
+
+    def _check_checkpoint(self, rows):
+        """
+        Checks that self.checkpoint can extend a panel of the given number of rows.
+        """
+        if self.checkpoint is None:
+            raise ValueError("extend needs the checkpoint of simulate_container_data with the vectorized engine.")
+        if self.checkpoint.min_trip_days != self.min_trip_days:
+            raise ValueError(f"The checkpoint was simulated with min_trip_days={self.checkpoint.min_trip_days}, "
+                             f"not {self.min_trip_days}.")
+        if rows != self.checkpoint.num_rows:
+            raise ValueError(f"The panel has {rows} rows, the checkpoint expects {self.checkpoint.num_rows}: "
+                             "only the unmodified panel of the last simulation can be extended.")
+
+    def _simulate_extension(self, days, rows):
+        """
+        Simulates the next days from self.checkpoint and moves the simulator and the checkpoint forward.
+
+        Args:
+            days (int): Number of days to add.
+            rows (int): Number of rows of the panel before the extension.
+
+        Returns:
+            tuple: The rows of the new days (pd.DataFrame) and the updates of the earlier rows,
+                   a list of (positions, column, values) to apply with patch_rows.
+        """
+        checkpoint = self.checkpoint
+        first_day = checkpoint.days
+        hazard_table = math_functions.HazardTable(self.get_recollecting_distribution())
+
+        results = [resume_shard_trips(state, first_day, days, hazard_table) for state in checkpoint.shard_states]
+        trips = pd.concat([shard_trips for shard_trips, _ in results], ignore_index=True)
+
+        # Rows of the new days
+        buffer = PanelBuffer(self.num_containers, days, first_day=first_day)
+        write_trips_to_buffer(trips, buffer, self.min_trip_days)
+        new_rows = self.update_fake_lost(buffer.to_frame(self.start_date))
+        new_tp, new_fp = self.count_lost_classification(new_rows)
+        new_rows = self.reassign_lost_value(new_rows)
+
+        # Earlier lost days of the trips running at the checkpoint that turn out to be fake lost
+        last_elapsed = trips["Duration"].to_numpy().astype(np.int64) - 1
+        start = trips["StartOffset"].to_numpy().astype(np.int64)
+        fake_lost = (trips["IsRecollected"].to_numpy() == 1) & (start < first_day) & (last_elapsed - 1 > self.min_trip_days)
+
+        first_lost_day = start[fake_lost] + self.min_trip_days + 1
+        n_lost_days = np.maximum(first_day - first_lost_day, 0)
+        lost_containers = np.repeat(trips["ContainerID"].to_numpy().astype(np.int64)[fake_lost], n_lost_days)
+        lost_days = np.repeat(first_lost_day, n_lost_days) + np.arange(n_lost_days.sum()) - np.repeat(np.cumsum(n_lost_days) - n_lost_days, n_lost_days)
+
+        positions = checkpoint.row_positions(lost_containers, lost_days)
+        patches = [(positions, "IsLost", 0), (positions, "IsFakeLost", 1)]
+
+        tp, fp = checkpoint.lost_classification
+        tp, fp = tp - len(positions) + new_tp, fp + len(positions) + new_fp
+
+        # Total stock of the earlier days gains the corrected rows
+        old_stock = self.daily_stock.to_numpy() + np.bincount(lost_days, minlength=first_day)
+        changed_days = np.unique(lost_days)
+        all_containers = np.arange(1, self.num_containers + 1)
+        positions = checkpoint.row_positions(np.tile(all_containers, len(changed_days)), np.repeat(changed_days, self.num_containers))
+        patches.append((positions, "TotalStock", old_stock[np.repeat(changed_days, self.num_containers)]))
+
+        day_offsets = self.get_day_offsets(new_rows["ActualDate"]) - first_day
+        new_stock = compute_daily_stock(day_offsets, new_rows["IsLost"].to_numpy(), days)
+        new_rows["TotalStock"] = new_stock[day_offsets]
+
+        self.days += days
+        self.raw_trips = None
+        self.daily_stock = self._to_daily_series(np.concatenate([old_stock, new_stock]))
+        self.set_eval_metrics(tp, fp)
+        checkpoint.shard_states = [state for _, state in results]
+        checkpoint.lost_classification = (tp, fp)
+        checkpoint.add_segment(days, rows)
+        return new_rows, patches
+
+    def _finalize_panel(self, df):
+        """
+        Applies the fake lost correction to the raw simulated data and adds the total stock.
+        """
+        # Update Is Fake Lost values to correctly calculate the field 
+        df = self.update_fake_lost(df)
+
+        # extraction of a KPI tod control the fake positive generated with the chosen threshold
+        self.calculate_fake_lost_percentage(df)
+        if self.checkpoint is not None:
+            self.checkpoint.lost_classification = self.lost_classification
+
+
+        # cleaning the data in order to reassign the lost values of the misclassified days
+        df = self.reassign_lost_value( df)
+
+        # Add Total Stock column calculated over the cleaned data.
+        day_offsets = self.get_day_offsets(df["ActualDate"])
+        stock = compute_daily_stock(day_offsets, df["IsLost"].to_numpy(), self.days)
+        self.daily_stock = self._to_daily_series(stock)
+        df["TotalStock"] = stock[day_offsets]
+
+        return df
+
+    def get_day_offsets(self, dates):
+        """
+        Converts dates of the simulation to day offsets from start_date.
+
+        Args:
+            dates (pd.Series): Dates of the simulation.
+
+        Returns:
+            np.ndarray: Day offsets.
+        """
+        return ((dates.to_numpy() - np.datetime64(self.start_date, "D")) // np.timedelta64(1, "D")).astype(np.intp)
+
+    def _to_daily_series(self, stock):
+        """
+        Wraps a per-day stock array in a Series indexed by ActualDate.
+        """
+        dates = pd.date_range(self.start_date, periods=self.days, freq="D", name="ActualDate")
+        return pd.Series(stock, index=dates, name="TotalStock")
+
+    def simulate_trip_table(self, n_workers=None):
+        """
+        Simulates the containers and returns one row per trip instead of one row per container and day.
+        The random numbers are the ones of simulate_container_data with the same n_workers,
+        so trips_to_panel rebuilds exactly the same daily panel.
+
+        Args:
+            n_workers (int, optional): Parallel mode, see simulate_container_data.
+
+        Returns:
+            pd.DataFrame: Trip table with ContainerID, TripID, StartOffset (days from start_date),
+                          Duration (days in trip, the last DayTrip), IsRecollected, IsLost and IsFakeLost.
+                          The daily total stock is stored in self.daily_stock.
+        """
+        trips = self.simulate_raw_trips(n_workers)
+
+        self.set_eval_metrics(*count_trip_lost_days(trips, self.min_trip_days))
+        self.daily_stock = self._to_daily_series(daily_stock_from_trips(trips, self.num_containers, self.days, self.min_trip_days))
+        return label_trips(trips, self.min_trip_days)
+
+    def simulate_raw_trips(self, n_workers=None):
+        """
+        Simulates the trips without their lost flags. The raw trips do not depend on min_trip_days,
+        so one simulation can be labelled for several thresholds (label_trips, count_trip_lost_days).
+
+        Args:
+            n_workers (int, optional): Parallel mode, see simulate_container_data.
+
+        Returns:
+            pd.DataFrame: Raw trips, see simulate_trips.
+        """
+        hazard_table = math_functions.HazardTable(self.get_recollecting_distribution())
+
+        n_workers = 1 if n_workers is None else n_workers
+        if n_workers < 1:
+            raise ValueError("n_workers must be at least 1.")
+        shards = self._get_shards(hazard_table)
+        if n_workers == 1:
+            results = [simulate_shard_trips(shard) for shard in shards]
         else:
-            # the underlying probability distribution in case of the second scenario has a different shape
-            # reflecting that the probability of experimenting a recollecting event it's less concentered around the mean ad it's lagged
-            adjusted_mu ,adjusted_sigma =  math_functions.calculate_adjusted_params(perc_trips_observed = self.perc_trips_observed , mu = 3.5, sigma = 0.3)
-            log_norm_dist =    math_functions.get_lognorm_distribution(mean= adjusted_mu , sigma = adjusted_sigma)
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                results = list(executor.map(simulate_shard_trips, shards))
+        trips = pd.concat([shard_trips for shard_trips, _ in results], ignore_index=True)
+
+        self.raw_trips = trips
+        return trips
+
+    def get_raw_trips(self):
+        """
+        Returns the raw trips of the last simulation. They are kept by the vectorized engine and
+        simulate_raw_trips, after the loop engine or iter_container_data they are simulated again
+        (without the panel) from the same random numbers.
+
+        Returns:
+            pd.DataFrame: Raw trips, see simulate_trips.
+        """
+        if self.raw_trips is None:
+            self.simulate_raw_trips()
+        return self.raw_trips
+
+    def relabel(self, min_trip_days):
+        """
+        Changes min_trip_days without simulating again: the raw trips of the last simulation are
+        labelled with the new threshold and eval_metrics, lost_classification and daily_stock are
+        recomputed. trips_to_panel rebuilds the daily panel of the new threshold if needed.
+        The checkpoint is dropped: the panel it describes was labelled with the previous threshold,
+        so it cannot be extended anymore.
+
+        Args:
+            min_trip_days (int): New min days expected for each trip.
+
+        Returns:
+            pd.DataFrame: Trip table of the new threshold, see simulate_trip_table.
+        """
+        trips = self.get_raw_trips()
+        self.min_trip_days = min_trip_days
+        self.checkpoint = None
+        self.set_eval_metrics(*count_trip_lost_days(trips, min_trip_days))
+        self.daily_stock = self._to_daily_series(daily_stock_from_trips(trips, self.num_containers, self.days, min_trip_days))
+        return label_trips(trips, min_trip_days)
+
+    def threshold_curve(self, thresholds, df=None):
+        """
+        Evaluates the lost classification for many values of min_trip_days at once, from the raw
+        trips of the last simulation (the precision-vs-threshold curve of a single simulation).
+
+        Args:
+            thresholds (array-like): Values of min_trip_days.
+            df (pd.DataFrame, optional): Panel (or chunk of panel) whose trips are evaluated instead
+                                         of the raw trips, see panel_trip_outcomes.
+
+        Returns:
+            pd.DataFrame: One row per threshold with min_trip_days, lost_trips, fake_lost_trips,
+                          true_positives, false_positives and the eval_metrics of the threshold
+                          (precision_treshold, F1_Score_threshold).
+        """
+        trips = self.get_raw_trips() if df is None else panel_trip_outcomes(df)
+        return classification_curve(trips, thresholds)
+
+    def daily_stock_by_threshold(self, thresholds):
+        """
+        TotalStock of each day for many values of min_trip_days, from the raw trips of the last simulation.
+
+        Args:
+            thresholds (array-like): Values of min_trip_days.
+
+        Returns:
+            pd.DataFrame: Total stock indexed by ActualDate, one column per threshold.
+        """
+        trips = self.get_raw_trips()
+        dates = pd.date_range(self.start_date, periods=self.days, freq="D", name="ActualDate")
+        return pd.DataFrame({
+            threshold: daily_stock_from_trips(trips, self.num_containers, self.days, threshold)
+            for threshold in thresholds
+        }, index=dates)
+
+    def trips_to_panel(self, trips):
+        """
+        Builds the daily panel of simulate_container_data from a trip table.
+
+        Args:
+            trips (pd.DataFrame): Trip table returned by simulate_trip_table.
+
+        Returns:
+            pd.DataFrame: Simulated container data, one row per container and day.
+        """
+        buffer = PanelBuffer(self.num_containers, self.days)
+        write_trips_to_buffer(trips, buffer, self.min_trip_days)
+        return self._finalize_panel(buffer.to_frame(self.start_date))
+
+    def _simulate_loop(self, hazard_table):
+        """
+        Reference engine: simulates the trips container by container and day by day.
 
+        Args:
+            hazard_table (math_functions.HazardTable): Recollecting probability by trip day.
 
-        # Initialize the dataframe
-        data = []
+        Returns:
+            pd.DataFrame: Raw simulated data, before the fake lost correction.
+        """
+        # Initialize the panel, days are stored as offsets from the start date
+        buffer = PanelBuffer(self.num_containers, self.days)
+        row = 0
+        # one random number per container and day, the ones of the vectorized engine
+        uniforms = self.draw_uniforms(hazard_table)
 
         for container_id in range(1, self.num_containers + 1):
-            starting_date = None
-            recollecting_date = None
+            starting_day = None
+            recollecting_day = None
             is_lost = 0
             day_trip = None
             trip_number = None
             current_trip = 0
             scaling_factor = 1
 
-            for actual_date in actual_dates:
-                if starting_date is None:  # Start a new trip
-                    if np.random.rand() > 0.7:  # 1- [VALUE] is the probability of starting a new trip
-                        starting_date = actual_date
+            for actual_day in range(self.days):
+                if starting_day is None:  # Start a new trip
+                    if uniforms[container_id - 1, actual_day] > 0.7:  # 1- [VALUE] is the probability of starting a new trip
+                        starting_day = actual_day
                         day_trip = 1
                         current_trip += 1
                         trip_number = current_trip
@@ -147,60 +538,514 @@ class DataSimulator:
                         day_trip = None
                         trip_number = None
                 else:
-                    if recollecting_date is None:  # Check for a recollecting date
-                        #print(f"get_lognorm_PDF : {math_functions.get_lognorm_PDF(log_norm_dist, day_trip)}")
-                        
-                        if np.random.rand() < math_functions.get_lognorm_PDF(log_norm_dist, day_trip, scaling_factor = scaling_factor ):
-                            #print("recollection")
-                            recollecting_date = actual_date
+                    if recollecting_day is None:  # Check for a recollecting date
+                        if uniforms[container_id - 1, actual_day] < hazard_table.get_pdf(day_trip, scaling_factor = scaling_factor ):
+                            recollecting_day = actual_day
 
                         else:
                             
-                            if actual_date > starting_date + timedelta(days=self.min_trip_days):
+                            if actual_day > starting_day + self.min_trip_days:
                                 is_lost = 1  # Mark as lost after max_trip_days if not recollected
 
                         if day_trip is not None:
                             day_trip += 1  # Increment day_trip for each day in trip
 
-                # Append current day's record
-                data.append({
-                    "ContainerID": container_id,
-                    "ActualDate": actual_date,
-                    "StartingDate": starting_date,
-                    "RecollectingDate": recollecting_date,
-                    "IsLost": is_lost,
-                    "DayTrip": day_trip,
-                    "TripID": trip_number,
-                    "IsFakeLost": 0  # Default value, to be updated later
-                })
-
-                if recollecting_date:  # Reset for the next trip after recollection
-                    starting_date = None
-                    recollecting_date = None
+                # Store current day's record
+                buffer.write_row(row, starting_day, recollecting_day, is_lost, day_trip, trip_number)
+                row += 1
+
+                if recollecting_day is not None:  # Reset for the next trip after recollection
+                    starting_day = None
+                    recollecting_day = None
                     is_lost = 0
                     day_trip = None
                     trip_number = None
 
-        # Create a DataFrame
-        df = pd.DataFrame(data)
+        return buffer.to_frame(self.start_date)
 
-        # Update Is Fake Lost values to correctly calculate the field 
-        df = self.update_fake_lost(df)
+    def _simulate_sharded(self, hazard_table, n_workers):
+        """
+        Vectorized engine: simulates the shards of containers with simulate_trips, in a process pool
+        when n_workers is greater than 1, then expands the trips to daily records.
 
-        # extraction of a KPI tod control the fake positive generated with the chosen threshold
-        self.calculate_fake_lost_percentage(df)
+        Args:
+            hazard_table (math_functions.HazardTable): Recollecting probability by trip day.
+            n_workers (int): Number of worker processes.
 
+        Returns:
+            pd.DataFrame: Raw simulated data of all the shards, before the fake lost correction.
+        """
+        if n_workers < 1:
+            raise ValueError("n_workers must be at least 1.")
 
-        # cleaning the data in order to reassign the lost values of the misclassified days
-        df = self.reassign_lost_value( df)
+        shards = self._get_shards(hazard_table)
 
-        # Add Total Stock column calculated over the cleaned data.
-        df["TotalStock"] = df.groupby("ActualDate")["IsLost"].transform(lambda x: (x == 0).sum())
+        if n_workers == 1:
+            results = [simulate_shard(shard) for shard in shards]
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                results = list(executor.map(simulate_shard, shards))
 
-        return df
-    
+        self.checkpoint = SimulationCheckpoint(
+            days=self.days,
+            shard_states=[state for _, state, _ in results],
+            min_trip_days=self.min_trip_days
+        )
+        self.raw_trips = pd.concat([trips for _, _, trips in results], ignore_index=True)
+
+        # the shards are returned in order of container ID, so the panel stays sorted
+        return pd.concat([frame for frame, _, _ in results], ignore_index=True)
+
+    def draw_uniforms(self, hazard_table):
+        """
+        Random numbers of the whole simulation, one per container and day, drawn from the streams
+        of the shards as simulate_shard_trips does.
+
+        Returns:
+            np.ndarray: (num_containers, days) uniform random numbers.
+        """
+        return np.concatenate([
+            shard_uniforms(np.random.default_rng(seed), num_containers, days)
+            for _, num_containers, days, seed, _, _, _ in self._get_shards(hazard_table)
+        ])
+
+    def _get_shards(self, hazard_table):
+        """
+        Splits the containers in ranges of shard_size IDs, each one with its own random stream.
+
+        Returns:
+            list: Arguments of simulate_shard for each shard.
+        """
+        first_ids = range(1, self.num_containers + 1, self.shard_size)
+        seeds = np.random.SeedSequence(self.seed).spawn(len(first_ids))
+        return [
+            (first_id, min(self.shard_size, self.num_containers - first_id + 1), self.days,
+             seed, hazard_table, self.min_trip_days, self.start_date)
+            for first_id, seed in zip(first_ids, seeds)
+        ]
+
+    def iter_container_data(self):
+        """
+        Simulates the container data shard by shard and yields one DataFrame per block of
+        shard_size containers, so the whole panel never has to fit in memory.
+
+        The chunks are the rows of simulate_container_data (with any n_workers),
+        with the fake lost correction already applied. A trip never spans two chunks.
+        TotalStock needs every container, so it is not a column of the chunks: the daily stock is
+        accumulated while iterating and stored in self.daily_stock (with self.eval_metrics)
+        once the generator is exhausted.
+
+        Yields:
+            pd.DataFrame: Simulated data of a block of containers.
+        """
+        hazard_table = math_functions.HazardTable(self.get_recollecting_distribution())
+        # the state of a previous simulation does not describe these chunks
+        self.checkpoint = None
+        self.raw_trips = None
+        tp, fp = 0, 0
+        daily_stock = np.zeros(self.days, dtype=np.int64)
+
+        for shard in self._get_shards(hazard_table):
+            chunk, _, _ = simulate_shard(shard)
+            chunk = self.update_fake_lost(chunk)
+
+            chunk_tp, chunk_fp = self.count_lost_classification(chunk)
+            tp, fp = tp + chunk_tp, fp + chunk_fp
+
+            chunk = self.reassign_lost_value(chunk)
+            daily_stock += compute_daily_stock(self.get_day_offsets(chunk["ActualDate"]), chunk["IsLost"].to_numpy(), self.days)
+
+            yield chunk
+
+        self.set_eval_metrics(tp, fp)
+        self.daily_stock = self._to_daily_series(daily_stock)
+
+    def write_parquet_dataset(self, path):
+        """
+        Streams the simulated chunks to a Parquet dataset on disk, one file per block of containers,
+        and stores the daily total stock next to it once all the chunks have been written.
+
+        Args:
+            path (str): Folder of the dataset.
+
+        Returns:
+            str: Folder of the dataset.
+        """
+        panel_io.write_panel_dataset(self.iter_container_data(), path)
+        panel_io.write_total_stock(self.daily_stock, path)
+        return path
+
+
+def simulate_shard_trips(shard):
+    """
+    Simulates the trips of a range of containers with its own random stream, used by the vectorized engine.
+
+    The random numbers are drawn day by day for the whole shard, so a shard can be resumed
+    with resume_shard_trips from the state returned here.
+
+    Args:
+        shard (tuple): First container ID, number of containers, days, np.random.SeedSequence of the shard,
+                       hazard table, min trip days and start date.
+
+    Returns:
+        pd.DataFrame: Raw trips of the shard, see simulate_trips.
+        dict: State of the shard, with the state of its containers and of its random generator.
+    """
+    first_id, num_containers, days, seed, hazard_table, _, _ = shard
+    rng = np.random.default_rng(seed)
+    trips, state = simulate_trips(shard_uniforms(rng, num_containers, days), hazard_table, first_container_id=first_id)
+    state.update(first_container_id=first_id, rng=rng.bit_generator.state)
+    return trips, state
+
+
+def resume_shard_trips(state, first_day, days, hazard_table):
+    """
+    Continues the simulation of a shard for some more days from its state.
+
+    Args:
+        state (dict): State of the shard returned by simulate_shard_trips or by a previous call.
+        first_day (int): Day offset of the first simulated day.
+        days (int): Number of days to simulate.
+        hazard_table (math_functions.HazardTable): Recollecting probability by trip day.
+
+    Returns:
+        pd.DataFrame: Trips running at first_day or started later, see simulate_trips.
+        dict: New state of the shard.
+    """
+    rng = np.random.default_rng()
+    rng.bit_generator.state = state["rng"]
+    num_containers = len(state["in_trip"])
+    trips, new_state = simulate_trips(shard_uniforms(rng, num_containers, days), hazard_table,
+                                      first_container_id=state["first_container_id"], state=state, first_day=first_day)
+    new_state.update(first_container_id=state["first_container_id"], rng=rng.bit_generator.state)
+    return trips, new_state
+
+
+def shard_uniforms(rng, num_containers, days):
+    """
+    Draws the random numbers of some days of a shard. They are drawn day by day for the whole shard,
+    so a stream resumed for more days continues where it stopped.
+
+    Returns:
+        np.ndarray: (num_containers, days) uniform random numbers.
+    """
+    return rng.random((days, num_containers)).T
+
+
+def simulate_shard(shard):
+    """
+    Simulates a range of containers with its own random stream, used by the vectorized engine.
+
+    Args:
+        shard (tuple): See simulate_shard_trips.
+
+    Returns:
+        pd.DataFrame: Raw simulated data of the shard.
+        dict: State of the shard, see simulate_shard_trips.
+        pd.DataFrame: Raw trips of the shard, see simulate_trips.
+    """
+    first_id, num_containers, days, _, _, min_trip_days, start_date = shard
+    trips, state = simulate_shard_trips(shard)
+    buffer = PanelBuffer(num_containers, days, first_container_id=first_id)
+    write_trips_to_buffer(trips, buffer, min_trip_days)
+    return buffer.to_frame(start_date), state, trips
+
+
+def simulate_trips(uniforms, hazard_table, first_container_id=1, state=None, first_day=0):
+    """
+    Advances all the containers one day at a time using state arrays and records one row per trip.
+
+    Every container and day consumes one random number: idle containers start a trip when it is
+    above 0.7, containers in a trip are recollected when it is below the recollecting probability.
+    The trips still running on the last day are kept as not recollected.
+
+    Args:
+        uniforms (np.ndarray): (containers, days) uniform random numbers, one per container and day.
+        hazard_table (math_functions.HazardTable): Recollecting probability by trip day.
+        first_container_id (int): ID of the first container.
+        state (dict, optional): State of the containers to resume from, returned by a previous call.
+        first_day (int): Day offset of the first column of uniforms.
+
+    Returns:
+        pd.DataFrame: Raw trips sorted by container and trip, with ContainerID, TripID,
+                      StartOffset, Duration and IsRecollected. When resuming, the trips running
+                      at the beginning are included with their whole duration.
+        dict: State of the containers after the last day: in_trip, trip_start, day_trip and current_trip.
+    """
+    n, days = uniforms.shape
+    scaling_factor = 1
+
+    # State of each container
+    if state is None:
+        in_trip = np.zeros(n, dtype=bool)
+        trip_start = np.full(n, -1, dtype=np.int16)
+        day_trip = np.zeros(n, dtype=np.int16)
+        current_trip = np.zeros(n, dtype=np.int16)
+    else:
+        in_trip = state["in_trip"].copy()
+        trip_start = state["trip_start"].copy()
+        day_trip = state["day_trip"].copy()
+        current_trip = state["current_trip"].copy()
+
+    # Finished trips: (containers, trip numbers, starts, durations, recollected)
+    trips = []
+
+    for day in range(days):
+        u = uniforms[:, day]
+
+        # Containers already in a trip can be recollected
+        hazard = hazard_table.get_pdf(day_trip, scaling_factor = scaling_factor)
+        recollected = in_trip & (u < hazard)
+        day_trip[in_trip] += 1
+
+        # Idle containers can start a new trip
+        started = ~in_trip & (u > 0.7)
+        in_trip[started] = True
+        trip_start[started] = first_day + day
+        day_trip[started] = 1
+        current_trip[started] += 1
+
+        # Record the recollected trips and reset them for the next trip
+        ended = np.flatnonzero(recollected)
+        if len(ended):
+            trips.append((ended, current_trip[ended], trip_start[ended], day_trip[ended], True))
+            in_trip[ended] = False
+            trip_start[ended] = -1
+            day_trip[ended] = 0
+
+    running = np.flatnonzero(in_trip)
+    trips.append((running, current_trip[running], trip_start[running], day_trip[running], False))
+
+    containers = np.concatenate([trip[0] for trip in trips])
+    trip_numbers = np.concatenate([trip[1] for trip in trips])
+    order = np.lexsort((trip_numbers, containers))
+
+    trip_table = pd.DataFrame({
+        "ContainerID": (containers[order] + first_container_id).astype(np.int32),
+        "TripID": trip_numbers[order],
+        "StartOffset": np.concatenate([trip[2] for trip in trips])[order],
+        "Duration": np.concatenate([trip[3] for trip in trips])[order],
+        "IsRecollected": np.concatenate([np.full(len(trip[0]), trip[4], dtype=np.int8) for trip in trips])[order],
+    })
+    final_state = {"in_trip": in_trip, "trip_start": trip_start, "day_trip": day_trip, "current_trip": current_trip}
+    return trip_table, final_state
+
+
+def label_trips(trips, min_trip_days):
+    """
+    Adds the lost flags to raw trips, with the same meaning as the corrected panel:
+    a trip is lost when it was not recollected and lasted more than min_trip_days,
+    it is fake lost when it was classified as lost before being recollected.
+
+    Args:
+        trips (pd.DataFrame): Raw trips, see simulate_trips.
+        min_trip_days (int): Min days expected for each trip.
+
+    Returns:
+        pd.DataFrame: Copy of the trips with IsLost and IsFakeLost.
+    """
+    # days elapsed from the start of the trip on its last day
+    last_elapsed = trips["Duration"].to_numpy() - 1
+    recollected = trips["IsRecollected"].to_numpy() == 1
+
+    labelled = trips.copy()
+    labelled["IsLost"] = (~recollected & (last_elapsed > min_trip_days)).astype(np.int8)
+    # the recollection day keeps the lost flag of the day before
+    labelled["IsFakeLost"] = (recollected & (last_elapsed - 1 > min_trip_days)).astype(np.int8)
+    return labelled
+
+
+def count_trip_lost_days(trips, min_trip_days):
+    """
+    Counts the days correctly and incorrectly classified as lost from the trips,
+    the same counts as DataSimulator.count_lost_classification on the panel.
+
+    Args:
+        trips (pd.DataFrame): Raw trips, see simulate_trips.
+        min_trip_days (int): Min days expected for each trip.
+
+    Returns:
+        tuple: True positives and false positives.
+    """
+    last_elapsed = trips["Duration"].to_numpy().astype(np.int64) - 1
+    recollected = trips["IsRecollected"].to_numpy() == 1
+
+    lost_days = np.maximum(last_elapsed - min_trip_days, 0)
+    fake_lost = recollected & (last_elapsed - 1 > min_trip_days)
+
+    tp = int(lost_days[~recollected].sum())
+    fp = int(lost_days[fake_lost].sum())
+    return tp, fp
+
+
+def panel_trip_outcomes(df):
+    """
+    Duration and recollection of the trips of a panel, read from its boolean columns without grouping:
+    a recollected trip ends on the row with a RecollectingDate and the other trips are still running
+    on the last day of the panel.
+
+    Args:
+        df (pd.DataFrame): Panel (or chunk of containers of a panel) of simulated container data.
+
+    Returns:
+        pd.DataFrame: ContainerID, TripID, Duration and IsRecollected of each trip, as the raw trips.
+    """
+    recollected = df["RecollectingDate"].notnull().to_numpy()
+    running = df["StartingDate"].notnull().to_numpy() & ~recollected & (df["ActualDate"] == df["ActualDate"].max()).to_numpy()
+    trip_end = recollected | running
+
+    return pd.DataFrame({
+        "ContainerID": df["ContainerID"].to_numpy()[trip_end],
+        "TripID": df["TripID"].to_numpy()[trip_end].astype(np.int64),
+        "Duration": df["DayTrip"].to_numpy()[trip_end].astype(np.int64),
+        "IsRecollected": recollected[trip_end].astype(np.int8),
+    })
+
+
+def classification_curve(trips, thresholds):
+    """
+    Lost classification of trips for each threshold in one pass, see DataSimulator.threshold_curve.
+
+    Args:
+        trips (pd.DataFrame): Trips with Duration and IsRecollected (raw trips or panel_trip_outcomes).
+        thresholds (array-like): Values of min_trip_days.
+
+    Returns:
+        pd.DataFrame: One row per threshold, see DataSimulator.threshold_curve.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.int64)
+    last_elapsed = trips["Duration"].to_numpy().astype(np.int64) - 1
+    recollected = trips["IsRecollected"].to_numpy() == 1
+
+    # lost days of the trips not recollected, sum of (last_elapsed - threshold) when positive
+    lost_trips, tp = tail_counts_and_sums(last_elapsed[~recollected], thresholds)
+    tp -= lost_trips * thresholds
+    # fake lost trips: recollected after last_elapsed - 1 > threshold, same lost days
+    fake_lost_trips, fp = tail_counts_and_sums(last_elapsed[recollected] - 1, thresholds)
+    fp -= fake_lost_trips * (thresholds - 1)
+
+    # fn = 0 as in set_eval_metrics, so the recall is 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        f1_score = np.where(tp > 0, 2 * precision / (precision + 1), 0.0)
+
+    return pd.DataFrame({
+        "min_trip_days": thresholds,
+        "lost_trips": lost_trips,
+        "fake_lost_trips": fake_lost_trips,
+        "true_positives": tp,
+        "false_positives": fp,
+        "precision_treshold": precision,
+        "F1_Score_threshold": f1_score,
+    })
+
+
+def tail_counts_and_sums(values, thresholds):
+    """
+    For each threshold, counts and sums the values strictly above it, with one sort of the values.
+
+    Args:
+        values (np.ndarray): Integer values.
+        thresholds (np.ndarray): Thresholds.
+
+    Returns:
+        tuple: Counts and sums (np.ndarray of int64) of the values above each threshold.
+    """
+    values = np.sort(values.astype(np.int64))
+    suffix_sums = np.concatenate([np.cumsum(values[::-1])[::-1], [0]])
+    positions = np.searchsorted(values, thresholds, side="right")
+    return len(values) - positions, suffix_sums[positions]
+
+
+def compute_daily_stock(day_offsets, is_lost, days):
+    """
+    Counts the containers not lost on each day of the simulation.
+
+    Args:
+        day_offsets (np.ndarray): Day offset of each row of the panel.
+        is_lost (np.ndarray): Lost flag of each row of the panel.
+        days (int): Number of days of the simulation.
+
+    Returns:
+        np.ndarray: Total stock of each day.
+    """
+    return np.bincount(day_offsets[is_lost == 0], minlength=days).astype(np.int64)
+
+
+def daily_stock_from_trips(trips, num_containers, days, min_trip_days):
+    """
+    Counts the containers not lost on each day of the simulation from the trips, without
+    building the panel. The lost days of a trip not recollected are the days after min_trip_days
+    and are added to a difference array.
+
+    Args:
+        trips (pd.DataFrame): Raw trips, see simulate_trips.
+        num_containers (int): Number of containers of the simulation.
+        days (int): Number of days of the simulation.
+        min_trip_days (int): Min days expected for each trip.
+
+    Returns:
+        np.ndarray: Total stock of each day.
+    """
+    last_elapsed = trips["Duration"].to_numpy().astype(np.int64) - 1
+    lost = (trips["IsRecollected"].to_numpy() == 0) & (last_elapsed > min_trip_days)
+    start = trips["StartOffset"].to_numpy().astype(np.int64)[lost]
+
+    # lost from the day start + min_trip_days + 1 to the last day of the trip
+    lost_changes = np.bincount(start + min_trip_days + 1, minlength=days + 1)
+    lost_changes -= np.bincount(start + last_elapsed[lost] + 1, minlength=days + 1)
+    return num_containers - np.cumsum(lost_changes[:days])
+
+
+def patch_rows(segments, positions, column, values):
+    """
+    Sets a column of some rows of a panel stored as a list of DataFrames, in place.
+
+    Args:
+        segments (list of pd.DataFrame): Consecutive blocks of rows of the panel.
+        positions (np.ndarray): Positions of the rows in the whole panel.
+        column (str): Column to set.
+        values (scalar or np.ndarray): New values, one per position for an array.
+    """
+    bounds = np.cumsum([0] + [len(segment) for segment in segments])
+    segment_index = np.searchsorted(bounds, positions, side="right") - 1
+    for index in np.unique(segment_index):
+        in_segment = segment_index == index
+        segment = segments[index]
+        segment_values = values[in_segment] if isinstance(values, np.ndarray) else values
+        segment.iloc[positions[in_segment] - bounds[index], segment.columns.get_loc(column)] = segment_values
+
+
+def write_trips_to_buffer(trips, buffer, min_trip_days):
+    """
+    Expands the trips to their daily records (before the fake lost correction) in a panel buffer.
+
+    Args:
+        trips (pd.DataFrame): Trips of the containers of the buffer, see simulate_trips.
+        buffer (PanelBuffer): Panel where the records are written.
+        min_trip_days (int): Min days expected for each trip.
+    """
+    duration = trips["Duration"].to_numpy().astype(np.int64)
+    recollected = trips["IsRecollected"].to_numpy() == 1
+    trip_start = trips["StartOffset"].to_numpy().astype(np.int64)
 
+    # skip the days before the first day of the buffer (trips resumed from a previous panel),
+    # so the cost depends on the days of the buffer and not on the length of the trips
+    skipped = np.clip(buffer.first_day - trip_start, 0, duration)
+    written = duration - skipped
 
+    # one entry per trip day, elapsed is the number of days from the start of the trip
+    trip_index = np.repeat(np.arange(len(trips)), written)
+    elapsed = np.arange(written.sum()) - np.repeat(np.cumsum(written) - written - skipped, written)
+    start = trip_start[trip_index]
+    recollection_day = recollected[trip_index] & (elapsed == duration[trip_index] - 1)
 
-#
+    container = trips["ContainerID"].to_numpy().astype(np.int64)[trip_index]
+    rows = (container - buffer.first_container_id) * buffer.days + start + elapsed - buffer.first_day
 
+    buffer.starting_day[rows] = start
+    buffer.recollecting_day[rows[recollection_day]] = (start + elapsed)[recollection_day]
+    buffer.day_trip[rows] = elapsed + 1
+    buffer.trip_id[rows] = trips["TripID"].to_numpy()[trip_index]
+    # lost after min_trip_days, the recollection day keeps the flag of the day before
+    buffer.is_lost[rows] = np.where(recollection_day, elapsed - 1, elapsed) > min_trip_days
@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+from utils.streaming_stats import RunningStats
+from utils.trip_aggregation import aggregate_panel_trips
 
 
 class DataTransformer:
@@ -16,6 +18,8 @@ class DataTransformer:
         """
         self.df = dataframe
         self.model_data = None  # Property to store prepared data for Kaplan-Meier estimation
+        # Trips of the panel, aggregated the first time they are needed
+        self.trip_aggregate = None
 
 
     def get_dataframe(self):
@@ -27,6 +31,19 @@ class DataTransformer:
         """
         return self.df
 
+    def get_trip_aggregate(self):
+        """
+        Returns the trips of the panel (see trip_aggregation.aggregate_panel_trips), aggregated once
+        and reused by create_summary_table and by the Modeler of the same panel.
+        Assigning a new DataFrame to self.df requires resetting self.trip_aggregate.
+
+        Returns:
+            TripAggregate: The trips of the panel.
+        """
+        if self.trip_aggregate is None:
+            self.trip_aggregate = aggregate_panel_trips(self.df)
+        return self.trip_aggregate
+
     def reassign_lost_value(self):
             """
             Reassigns the value of the 'Lost' column to 0 if 'Lost' == 1 and 'Is Fake Lost' == 1.
@@ -44,42 +61,65 @@ class DataTransformer:
         Creates a summary table with the average percentage of days containers are in a trip,
         the percentage of incorrectly classified lost days, and additional metrics.
 
+        The trips are aggregated once (see get_trip_aggregate), the aggregation can be passed to
+        the Modeler of the same panel.
+
         Returns:
             pd.DataFrame: A summary DataFrame with KPIs.
             pd.series: The distribution of days in trip for all the trips
         """
-        # Calculate the percentage of rows where StartingDate is not null
-        total_rows = len(self.df)
-        days_in_trip = self.df["StartingDate"].notnull().sum()
-        perc_days_in_trip = days_in_trip / total_rows
-
-
-
+        return summarize_aggregates([self.get_trip_aggregate()], dictionary_metrics)
 
-        groupby_trip_all = self.df.groupby(["ContainerID", "TripID"])
-        day_trip_all = groupby_trip_all["DayTrip"].max()
 
+def summarize_chunks(chunks, dictionary_metrics):
+    """
+    Creates the summary table of create_summary_table from a chunked panel (e.g.
+    DataSimulator.iter_container_data() or panel_io.iter_panel_dataset()), one chunk at a time.
+    The chunks must not split a trip, as the simulator chunks by block of containers.
 
-        #median_trip = groupby_trip_all["DayTrip"].median().reset_index(name="Median")
-        median_trip = day_trip_all.median()
-
-        # Calculate average and variance of DayTrip
-        avg_days_trip = day_trip_all.mean()
-        var_days_trip = day_trip_all.var()
-
+    Parameters:
+        chunks (iterable of pd.DataFrame): Chunks of the panel.
+        dictionary_metrics (dict): Evaluation metrics of the simulator.
 
+    Returns:
+        pd.DataFrame: A summary DataFrame with KPIs.
+        pd.series: The distribution of days in trip for all the trips
+    """
+    return summarize_aggregates((aggregate_panel_trips(chunk) for chunk in chunks), dictionary_metrics)
 
-        summary = pd.DataFrame({
-            "Percentage Days in Trip": [perc_days_in_trip],
-            "Trip Precision user treshold":dictionary_metrics.get("precision_treshold"),
-            "Median trip duration":median_trip,
-            "Average trip duration": [avg_days_trip],
-            "Variance trip duration": [var_days_trip],
-        })
-
-        return summary , day_trip_all
-    
 
+def summarize_aggregates(aggregates, dictionary_metrics):
+    """
+    Creates the summary table of create_summary_table from the trips of the chunks of a panel.
 
+    Parameters:
+        aggregates (iterable of TripAggregate): Trips of each chunk.
+        dictionary_metrics (dict): Evaluation metrics of the simulator.
 
-    
+    Returns:
+        pd.DataFrame: A summary DataFrame with KPIs.
+        pd.series: The distribution of days in trip for all the trips
+    """
+    total_rows, days_in_trip = 0, 0
+    duration_stats = RunningStats()
+    day_trip_chunks = []
+
+    for aggregate in aggregates:
+        total_rows += aggregate.rows
+        days_in_trip += aggregate.rows_in_trip
+        duration_stats.update(aggregate.trips["DayTrip"])
+        day_trip_chunks.append(aggregate.trips.set_index(["ContainerID", "TripID"])["DayTrip"])
+
+    # Calculate the percentage of rows where StartingDate is not null
+    perc_days_in_trip = days_in_trip / total_rows
+
+    summary = pd.DataFrame({
+        "Percentage Days in Trip": [perc_days_in_trip],
+        "Trip Precision user treshold":dictionary_metrics.get("precision_treshold"),
+        "Median trip duration":duration_stats.median,
+        "Average trip duration": [duration_stats.mean if duration_stats.count else np.nan],
+        "Variance trip duration": [duration_stats.variance],
+    })
+
+    day_trip_all = pd.concat(day_trip_chunks) if len(day_trip_chunks) > 1 else day_trip_chunks[0]
+    return summary , day_trip_all
@@ -1,9 +1,23 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
-from lifelines import KaplanMeierFitter
+from components.StepFunction import StepFunction
+from components.SurvivalEstimator import KaplanMeierEstimator, bootstrap_survival, stratified_survival, trip_outcome_pmfs
+from utils import math_functions
+from utils.trip_aggregation import aggregate_panel_trips, pack_trip_key
+
+
+# Fitted Kaplan-Meier models by fingerprint of the trip table, shared by every Modeler
+# (and so by every Streamlit session) of the process.
+_KM_CACHE = OrderedDict()
+_KM_CACHE_SIZE = 16
+_KM_CACHE_LOCK = threading.Lock()
 
 
 class Modeler:
-    def __init__(self, df, prob_in_trip):
+    def __init__(self, df, prob_in_trip, trips=None, strata=None):
         """
         Initialize the Modeler class with a DataFrame.
 
@@ -11,14 +25,84 @@ class Modeler:
             df (pd.DataFrame): The input DataFrame, which must contain:
                 - 'DayTrip': Duration of each trip.
                 - 'IsLost': 1 if the container was lost, 0 otherwise.
-                - 'UniqueTripID': A unique identifier for each trip.
+                - 'TripKey': A unique identifier for each trip (see trip_aggregation.pack_trip_key).
             prob_in_trip (float): The probability of a container being in a trip.
+            trips (pd.DataFrame, optional): Already aggregated trips (see aggregate_trips),
+                used instead of preparing df.
+            strata (list of str, optional): Columns of df describing the trip (customer, region,
+                container type...) kept in the trip table for the stratified models.
         """
         self.original_df = df
-        self.df = self.prepare_data_for_analysis()
+        self.strata = strata
+        self.df = self.prepare_data_for_analysis() if trips is None else trips
         self.prob_in_trip = prob_in_trip
         self.pecentage_not_lost_t_max =  1 - self.df['IsLost'].mean()
         self.median_trip_time = self.df['DayTrip'].median()
+
+    @property
+    def df(self):
+        """
+        The trip table used by the models. Assigning a new table invalidates its fingerprint,
+        so the next fit is looked up again (the table must not be modified in place).
+        """
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        self._df = value
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self):
+        """
+        Cheap fingerprint of the durations and lost flags of the trip table, computed once per table.
+
+        Returns:
+            str: Hexadecimal digest identifying the data of the Kaplan-Meier fit.
+        """
+        if self._fingerprint is None:
+            hashes = pd.util.hash_pandas_object(self.df[['DayTrip', 'IsLost']], index=False)
+            self._fingerprint = hashlib.sha1(hashes.to_numpy().tobytes()).hexdigest()
+        return self._fingerprint
+
+    @classmethod
+    def from_chunks(cls, chunks, prob_in_trip):
+        """
+        Build the Modeler from a chunked panel (e.g. DataSimulator.iter_container_data() or
+        panel_io.iter_panel_dataset()), aggregating the trips one chunk at a time.
+        The chunks must not split a trip, as the simulator chunks by block of containers.
+
+        Parameters:
+            chunks (iterable of pd.DataFrame): Chunks of the panel.
+            prob_in_trip (float): The probability of a container being in a trip.
+
+        Returns:
+            Modeler: Modeler over the trips of all the chunks.
+        """
+        trips = pd.concat([aggregate_trips(chunk) for chunk in chunks], ignore_index=True)
+        return cls(None, prob_in_trip, trips=trips)
+
+    @classmethod
+    def from_trip_table(cls, trips, prob_in_trip):
+        """
+        Build the Modeler from the trip table of DataSimulator.simulate_trip_table,
+        without going through the daily panel.
+
+        Parameters:
+            trips (pd.DataFrame): Trip table with 'ContainerID', 'TripID', 'Duration', 'IsLost' and 'IsRecollected'.
+            prob_in_trip (float): The probability of a container being in a trip.
+
+        Returns:
+            Modeler: Modeler over the trips of the table.
+        """
+        aggregated = pd.DataFrame({
+            "TripKey": pack_trip_key(trips["ContainerID"], trips["TripID"]),
+            "DayTrip": trips["Duration"].astype(float),
+            "IsLost": trips["IsLost"].astype("int64"),
+            "IsRecollected": trips["IsRecollected"].astype(np.int8),
+        })
+        return cls(None, prob_in_trip, trips=aggregated.sort_values("TripKey", ignore_index=True))
+
     def prepare_data_for_analysis(self):
         """
         Preprocess and clean the DataFrame for Kaplan-Meier and other analyses.
@@ -26,64 +110,57 @@ class Modeler:
         Returns:
             pd.DataFrame: Preprocessed DataFrame.
         """
-        data = self.original_df.copy()
-        data["UniqueTripID"] = data["ContainerID"].astype(str) + "_" + data["TripID"].astype(str)
-        data = data[data["StartingDate"].notnull()]
-        groupby_trip = data.groupby("UniqueTripID")
-        aggregated = pd.DataFrame({
-            "DayTrip": groupby_trip["DayTrip"].max(),
-            "IsLost": groupby_trip["IsLost"].max()
-        }).reset_index()
-        return aggregated.dropna(subset=["DayTrip", "IsLost"]).reset_index(drop=True)
+        return aggregate_trips(self.original_df, strata=self.strata)
 
     def kaplan_meier_fitter(self):
         """
         Fit the Kaplan-Meier model and return the fitter object.
+        The model is fitted once per trip table and reused, the returned object must not be modified.
 
         Returns:
-            KaplanMeierFitter: Fitted Kaplan-Meier model.
+            KaplanMeierEstimator: Fitted Kaplan-Meier model.
         """
-        kmf = KaplanMeierFitter()
+        key = self.fingerprint
+        with _KM_CACHE_LOCK:
+            kmf = _KM_CACHE.get(key)
+            if kmf is not None:
+                _KM_CACHE.move_to_end(key)
+                return kmf
+
+        kmf = KaplanMeierEstimator()
         kmf.fit(self.df['DayTrip'], event_observed=self.df['IsLost'])
+
+        with _KM_CACHE_LOCK:
+            _KM_CACHE[key] = kmf
+            while len(_KM_CACHE) > _KM_CACHE_SIZE:
+                _KM_CACHE.popitem(last=False)
         return kmf
     
     def get_km_estimate_at_timeline(self, survival_function):
         """
-        Get the KM estimate at a specific timeline.
+        Get the KM estimate at the median trip time.
 
         Parameters:
             survival_function (pd.DataFrame): The survival function DataFrame from Kaplan-Meier fitting.
-            self.median_trip_time (float): The specific time point to extract the KM estimate.
 
         Returns:
-            float: The survival probability (KM estimate) at the given timeline.
+            float: The survival probability (KM estimate) at the median trip time.
         """
-        print(self.median_trip_time)
-        print(survival_function)
-        if self.median_trip_time in survival_function.index:
-            return survival_function.loc[self.median_trip_time , 'KM_estimate']
-        else:
-            raise ValueError(f"Timeline {self.median_trip_time } not found in the survival function index.")
-        
+        return self.get_km_estimate_at_specific_timeline(self.median_trip_time, survival_function)
 
     def get_km_estimate_at_specific_timeline(self, timeline, survival_function):
         """
-        Get the KM estimate at a specific timeline.
+        Get the KM estimate at any timeline, the survival function is a step function so
+        the estimate is the one of the last time of its index not after the timeline.
 
         Parameters:
+            timeline (float or array-like): Time point(s) to evaluate.
             survival_function (pd.DataFrame): The survival function DataFrame from Kaplan-Meier fitting.
-            self.median_trip_time (float): The specific time point to extract the KM estimate.
 
         Returns:
-            float: The survival probability (KM estimate) at the given timeline.
+            float or np.ndarray: The survival probability (KM estimate) at the given timeline(s).
         """
-
-        if timeline in survival_function.index:
-            return survival_function.loc[timeline , 'KM_estimate']
-        else:
-            raise ValueError(f"Timeline {timeline} not found in the survival function index.")
-        
-    
+        return StepFunction.from_frame(survival_function)(timeline)
 
     def mapped_survival_function(self):
         """
@@ -105,8 +182,6 @@ class Modeler:
         #print( self.pecentage_not_lost_t_max )
         mapped_survival = self.pecentage_not_lost_t_max + mapped_survival * (1 - self.pecentage_not_lost_t_max)
 
-        print ( mapped_survival )
-
         return mapped_survival
 
     def calculate_available_containers(self, initial_containers):
@@ -123,6 +198,51 @@ class Modeler:
         survival_prob = kmf.survival_function_['KM_estimate']
         return initial_containers * self.prob_in_trip * survival_prob
 
+    def project_fleet(self, initial_containers, days, start_rate=None, lost_after=None):
+        """
+        Time-varying projection of the containers instead of a constant shrinking rate: each trip
+        returns or is lost after d days with the probabilities S(d-) * h(d) of the Kaplan-Meier
+        model of the trip durations with two competing ends, recollection and loss
+        (see SurvivalEstimator.trip_outcome_pmfs and math_functions.project_trip_flows).
+
+        The trips still running at the end of the data without being lost are censored, not returned.
+        A lost trip is only known to be lost when the data ends, so it is counted as lost on the
+        day it was classified as lost, lost_after days after its start.
+
+        Parameters:
+            initial_containers (int): The initial number of containers.
+            days (int): The number of days to project.
+            start_rate (float, optional): Daily probability of an idle container starting a trip.
+                By default, the one giving prob_in_trip as the share of days in trip of the containers.
+            lost_after (int, optional): Days in trip before a container not recollected is lost
+                (min_trip_days + 1). By default, the shortest lost trip minus its first lost day.
+
+        Returns:
+            pd.DataFrame: Expected 'Starts', 'InTrip', 'Returned', 'Lost', 'Idle' and 'Containers'
+                          (not lost) of each 'Day'.
+        """
+        if 'IsRecollected' not in self.df.columns:
+            raise ValueError("project_fleet needs the 'IsRecollected' flag of the trips.")
+
+        durations = self.df['DayTrip'].to_numpy()
+        lost = self.df['IsLost'].to_numpy() == 1
+        if lost_after is None:
+            # the lost flag starts on the last day of the shortest lost trips
+            lost_after = int(durations[lost].min()) - 1 if lost.any() else 0
+
+        returned_pmf, lost_pmf = trip_outcome_pmfs(
+            np.where(lost, lost_after, durations), lost, self.df['IsRecollected'].to_numpy() == 1
+        )
+
+        if start_rate is None:
+            # a container is in trip for the mean duration and then idle for (1 - r) / r days on average
+            mean_duration = self.df['DayTrip'].mean()
+            start_rate = self.prob_in_trip / (self.prob_in_trip + mean_duration * (1 - self.prob_in_trip))
+
+        return math_functions.project_trip_flows(
+            initial_containers, days, returned_pmf, lost_pmf, start_rate=start_rate
+        )
+
     def shrinking_rate_at_median(self):
         """
         Calculate the shrinking risk (probability of being lost) at the median trip duration.
@@ -132,9 +252,134 @@ class Modeler:
         """
         kmf = self.kaplan_meier_fitter()
 
-        # Median trip duration
-        median_duration = self.df['DayTrip'].median()
-
         # Risk of loss at the median duration
-        shrinking_risk = 1 - kmf.survival_function_.loc[median_duration, 'KM_estimate']
+        shrinking_risk = 1 - self.get_km_estimate_at_timeline(kmf.survival_function_)
         return shrinking_risk
+
+    def bootstrap_confidence_intervals(self, n_resamples=1000, confidence=0.95, initial_containers=None,
+                                       seed=None, n_workers=None):
+        """
+        Percentile bootstrap confidence intervals of the shrinking rate and of the available containers.
+        The trips are resampled n_resamples times and the Kaplan-Meier model is refitted on each
+        resample (see SurvivalEstimator.bootstrap_survival).
+
+        Parameters:
+            n_resamples (int): Number of bootstrap resamples.
+            confidence (float): Confidence level of the intervals.
+            initial_containers (int, optional): When set, the interval of calculate_available_containers
+                                                is also returned.
+            seed (int, optional): Seed of the resampling.
+            n_workers (int, optional): Number of processes used for the resampling.
+
+        Returns:
+            dict: Intervals as (lower, upper) tuples:
+                - 'shrinking_rate': shrinking_rate_at_median.
+                - 'mapped_shrinking_rate': 1 - mapped_survival_function at the median trip time,
+                  the shrinking rate shown in the app.
+                - 'available_containers' (only with initial_containers): DataFrame indexed by
+                  timeline with the 'lower' and 'upper' columns.
+        """
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1.")
+
+        timeline, survival, lost_fraction = bootstrap_survival(
+            self.df['DayTrip'], self.df['IsLost'], n_resamples=n_resamples, seed=seed, n_workers=n_workers
+        )
+        quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+
+        # survival of each resample at the median, the last time of the timeline not after it
+        median_position = np.searchsorted(timeline, self.median_trip_time, side='right') - 1
+        survival_at_median = survival[:, median_position]
+
+        # same mapping as mapped_survival_function, with the min and max of each resample
+        min_value = survival.min(axis=1)
+        max_value = survival.max(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mapped_at_median = (survival_at_median - min_value) / (max_value - min_value)
+        not_lost = 1 - lost_fraction
+        mapped_at_median = not_lost + mapped_at_median * (1 - not_lost)
+
+        intervals = {
+            'shrinking_rate': tuple(np.quantile(1 - survival_at_median, quantiles)),
+            'mapped_shrinking_rate': tuple(np.nanquantile(1 - mapped_at_median, quantiles)),
+        }
+        if initial_containers is not None:
+            lower, upper = np.quantile(initial_containers * self.prob_in_trip * survival, quantiles, axis=0)
+            intervals['available_containers'] = pd.DataFrame(
+                {'lower': lower, 'upper': upper}, index=pd.Index(timeline.astype(float), name='timeline')
+            )
+        return intervals
+
+    def stratified_survival_function(self, by):
+        """
+        Fit the Kaplan-Meier model of every stratum of the trip table in one pass
+        (see SurvivalEstimator.stratified_survival).
+
+        Parameters:
+            by (str): Column of the trip table with the stratum of each trip.
+
+        Returns:
+            pd.DataFrame: Tidy table with the columns by, 'timeline', 'at_risk', 'observed' and 'KM_estimate'.
+        """
+        if by not in self.df.columns:
+            raise ValueError(f"Column '{by}' not found in the trip table, pass it in strata.")
+        return stratified_survival(self.df[by], self.df['DayTrip'], self.df['IsLost'])
+
+    def shrinking_rate_by_stratum(self, by):
+        """
+        Calculate the shrinking rate of every stratum at the median trip duration of the stratum,
+        as shrinking_rate_at_median does for the whole trip table.
+
+        Parameters:
+            by (str): Column of the trip table with the stratum of each trip.
+
+        Returns:
+            pd.DataFrame: One row per stratum with the columns by, 'trips', 'median_trip_time'
+                          and 'shrinking_rate'.
+        """
+        survival = self.stratified_survival_function(by)
+
+        groupby_stratum = self.df.groupby(by, sort=True)['DayTrip']
+        summary = pd.DataFrame({
+            'trips': groupby_stratum.size(),
+            'median_trip_time': groupby_stratum.median(),
+        }).reset_index()
+
+        # survival at the last time of each stratum not after its median
+        summary['timeline'] = np.floor(summary['median_trip_time'])
+        summary = pd.merge_asof(
+            summary.sort_values('timeline'), survival[[by, 'timeline', 'KM_estimate']].sort_values('timeline'),
+            on='timeline', by=by
+        )
+        summary['shrinking_rate'] = 1 - summary.pop('KM_estimate')
+        return summary.drop(columns='timeline').sort_values(by, ignore_index=True)
+
+
+def aggregate_trips(df, strata=None):
+    """
+    Collapse the daily panel to one row per trip with its duration and lost flag.
+
+    Parameters:
+        df (pd.DataFrame): Panel (or chunk of panel) of simulated container data.
+        strata (list of str, optional): Columns to keep, with their value at the start of the trip.
+
+    Returns:
+        pd.DataFrame: One row per trip with 'TripKey', 'DayTrip', 'IsLost', 'IsRecollected' and the
+                      strata columns, sorted by TripKey.
+    """
+    return trips_from_aggregate(aggregate_panel_trips(df, strata), strata)
+
+
+def trips_from_aggregate(aggregate, strata=None):
+    """
+    Trip table of the Modeler from the trips of a panel already aggregated
+    (e.g. DataTransformer.get_trip_aggregate()), to pass as Modeler(..., trips=...).
+
+    Parameters:
+        aggregate (TripAggregate): Trips of the panel.
+        strata (list of str, optional): Strata columns of the aggregate to keep.
+
+    Returns:
+        pd.DataFrame: See aggregate_trips.
+    """
+    return aggregate.trips[["TripKey", "DayTrip", "IsLost", "IsRecollected"] + list(strata or [])]
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+
+class PanelBuffer:
+    """
+    Preallocated columnar storage for the simulated panel, one row per container and day.
+
+    The rows are stored container by container (row = container index * days + day index) in typed
+    NumPy arrays. The dates are stored as day offsets from the start date and the missing
+    values as sentinels (-1 for the dates, 0 for the day trip and the trip number), the
+    public DataFrame is only assembled at the end by to_frame.
+    """
+
+    def __init__(self, num_containers, days, first_container_id=1, first_day=0):
+        """
+        Allocates the arrays of the panel.
+
+        Args:
+            num_containers (int): Number of containers of the panel.
+            days (int): Number of days of the panel.
+            first_container_id (int): ID of the first container of the panel.
+            first_day (int): Day offset of the first day of the panel, when it extends a previous one.
+        """
+        if first_day + days > np.iinfo(np.int16).max:
+            raise ValueError(f"The panel supports at most {np.iinfo(np.int16).max} days.")
+
+        self.num_containers = num_containers
+        self.days = days
+        self.first_container_id = first_container_id
+        self.first_day = first_day
+        size = num_containers * days
+
+        self.container_id = np.repeat(np.arange(first_container_id, first_container_id + num_containers, dtype=np.int32), days)
+        self.actual_day = np.tile(np.arange(first_day, first_day + days, dtype=np.int16), num_containers)
+        self.starting_day = np.full(size, -1, dtype=np.int16)
+        self.recollecting_day = np.full(size, -1, dtype=np.int16)
+        self.is_lost = np.zeros(size, dtype=np.int8)
+        self.day_trip = np.zeros(size, dtype=np.int16)
+        self.trip_id = np.zeros(size, dtype=np.int16)
+        self.is_fake_lost = np.zeros(size, dtype=np.int8)
+
+    def write_row(self, row, starting_day, recollecting_day, is_lost, day_trip, trip_id):
+        """
+        Writes the record of one container at one day, None values are stored as sentinels.
+        """
+        if starting_day is not None:
+            self.starting_day[row] = starting_day
+        if recollecting_day is not None:
+            self.recollecting_day[row] = recollecting_day
+        self.is_lost[row] = is_lost
+        if day_trip is not None:
+            self.day_trip[row] = day_trip
+            self.trip_id[row] = trip_id
+
+    @property
+    def nbytes(self):
+        """
+        Total size in bytes of the arrays of the buffer.
+        """
+        return sum(array.nbytes for array in (
+            self.container_id, self.actual_day, self.starting_day, self.recollecting_day,
+            self.is_lost, self.day_trip, self.trip_id, self.is_fake_lost
+        ))
+
+    def to_frame(self, start_date):
+        """
+        Assembles the public DataFrame of the simulation from the arrays.
+
+        Every column is converted once to its public dtype and handed to pandas without
+        a further copy.
+
+        Args:
+            start_date (str): Date of the day offset 0, in "%Y-%m-%d" format.
+
+        Returns:
+            pd.DataFrame: Panel with the columns ContainerID, ActualDate, StartingDate,
+                          RecollectingDate, IsLost, DayTrip, TripID and IsFakeLost.
+        """
+        start = np.datetime64(start_date, "D")
+        in_trip = self.day_trip > 0
+
+        return pd.DataFrame({
+            "ContainerID": self.container_id.astype(np.int64),
+            "ActualDate": offsets_to_dates(self.actual_day, start),
+            "StartingDate": offsets_to_dates(self.starting_day, start),
+            "RecollectingDate": offsets_to_dates(self.recollecting_day, start),
+            "IsLost": self.is_lost.astype(np.int64),
+            "DayTrip": np.where(in_trip, self.day_trip, np.nan),
+            "TripID": np.where(in_trip, self.trip_id, np.nan),
+            "IsFakeLost": self.is_fake_lost.astype(np.int64),
+        }, copy=False)
+
+
+def offsets_to_dates(offsets, start):
+    """
+    Converts day offsets from the start date to datetime64[ns] dates, negative offsets are NaT.
+
+    Args:
+        offsets (np.ndarray): Day offsets.
+        start (np.datetime64): Date of the offset 0.
+
+    Returns:
+        np.ndarray: Array of datetime64[ns] dates.
+    """
+    dates = (start + offsets.astype(np.int64)).astype("datetime64[ns]")
+    dates[offsets < 0] = np.datetime64("NaT")
+    return dates
@@ -0,0 +1,108 @@
+import pickle
+import numpy as np
+
+
+class SimulationCheckpoint:
+    """
+    State of a simulation at the end of its last simulated day, used by DataSimulator.extend
+    to add more days without simulating the whole horizon again.
+
+    For every shard of containers it keeps the current trip start, day in trip, trip number
+    and the state of the random generator, together with the layout of the panel rows
+    so that the rows of the trips still running can be updated in place.
+    """
+
+    def __init__(self, days, shard_states, min_trip_days):
+        """
+        Args:
+            days (int): Number of days simulated so far.
+            shard_states (list): State of each shard, see DataSimulator.simulate_shard_trips.
+            min_trip_days (int): Min days expected for each trip.
+        """
+        self.days = days
+        self.shard_states = shard_states
+        self.min_trip_days = min_trip_days
+        # True positives and false positives of the lost classification so far
+        self.lost_classification = (0, 0)
+        # The panel is a sequence of segments stored container by container: (first day, days, first row)
+        self.segments = [(0, days, 0)]
+
+    def _concat(self, key):
+        return np.concatenate([state[key] for state in self.shard_states])
+
+    @property
+    def trip_start(self):
+        """
+        Day offset of the start of the current trip of each container, -1 if not in trip.
+        """
+        return self._concat("trip_start")
+
+    @property
+    def day_trip(self):
+        """
+        Day in trip of each container on the last simulated day, 0 if not in trip.
+        """
+        return self._concat("day_trip")
+
+    @property
+    def trip_number(self):
+        """
+        Number of trips started so far by each container.
+        """
+        return self._concat("current_trip")
+
+    @property
+    def is_lost(self):
+        """
+        Lost flag of each container on the last simulated day.
+        """
+        in_trip = self._concat("in_trip")
+        return (in_trip & (self.days - 1 - self.trip_start > self.min_trip_days)).astype(np.int8)
+
+    @property
+    def num_rows(self):
+        """
+        Number of rows of the panel simulated so far: one per container and day.
+        """
+        return self.days * sum(len(state["trip_start"]) for state in self.shard_states)
+
+    def add_segment(self, days, first_row):
+        """
+        Records the rows of days appended to the panel by an extension.
+
+        Args:
+            days (int): Number of days added.
+            first_row (int): Position in the panel of the first added row.
+        """
+        self.segments.append((self.days, days, first_row))
+        self.days += days
+
+    def row_positions(self, container_ids, day_offsets):
+        """
+        Returns the positions in the panel of the rows of the given containers and days.
+
+        Args:
+            container_ids (np.ndarray): Container IDs, starting from 1.
+            day_offsets (np.ndarray): Day offsets from the start date.
+
+        Returns:
+            np.ndarray: Row positions.
+        """
+        first_days, days, first_rows = (np.array(values) for values in zip(*self.segments))
+        segment = np.searchsorted(first_days, day_offsets, side="right") - 1
+        return first_rows[segment] + (container_ids - 1) * days[segment] + day_offsets - first_days[segment]
+
+    def save(self, path):
+        """
+        Saves the checkpoint to a file.
+        """
+        with open(path, "wb") as file:
+            pickle.dump(self, file)
+
+    @staticmethod
+    def load(path):
+        """
+        Loads a checkpoint saved with save.
+        """
+        with open(path, "rb") as file:
+            return pickle.load(file)
@@ -0,0 +1,59 @@
+import numpy as np
+
+
+class StepFunction:
+    """
+    Right-continuous step function, e.g. a Kaplan-Meier survival function.
+
+    The value at time t is the value of the last time of the function not after t, found with
+    np.searchsorted, so any time (not only the ones of the index) can be queried in O(log n),
+    one by one or as an array.
+    """
+
+    def __init__(self, times, values, before=1.0):
+        """
+        Parameters:
+            times (array-like): Times of the steps, sorted in increasing order.
+            values (array-like): Value of the function from each time until the next one.
+            before (float): Value before the first time (1 for a survival function).
+        """
+        self.times = np.asarray(times, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+        if self.times.shape != self.values.shape or self.times.ndim != 1:
+            raise ValueError("times and values must be one dimensional arrays of the same length.")
+        if np.any(np.diff(self.times) <= 0):
+            raise ValueError("times must be sorted in increasing order.")
+
+        # position 0 is the value before the first time
+        self._values = np.concatenate([[before], self.values])
+
+    @classmethod
+    def from_frame(cls, frame, column="KM_estimate", before=1.0):
+        """
+        Build the step function of a column of a DataFrame indexed by time,
+        e.g. KaplanMeierEstimator.survival_function_ or Modeler.mapped_survival_function().
+
+        Parameters:
+            frame (pd.DataFrame): DataFrame indexed by time.
+            column (str): Column with the values of the function.
+            before (float): Value before the first time.
+
+        Returns:
+            StepFunction: The step function of the column.
+        """
+        return cls(frame.index.to_numpy(), frame[column].to_numpy(), before=before)
+
+    def __call__(self, t):
+        """
+        Evaluates the function.
+
+        Parameters:
+            t (float or array-like): Time(s) to evaluate, NaN times give NaN.
+
+        Returns:
+            float or np.ndarray: Value(s) of the function at the given time(s).
+        """
+        times = np.asarray(t, dtype=float)
+        result = self._values[np.searchsorted(self.times, times, side="right")]
+        result = np.where(np.isnan(times), np.nan, result)
+        return float(result) if result.ndim == 0 else result
@@ -0,0 +1,294 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from components.StepFunction import StepFunction
+
+
+class KaplanMeierEstimator:
+    """
+    Kaplan-Meier and Nelson-Aalen estimators for integer durations (days in trip),
+    computed with np.bincount instead of a general purpose survival library.
+
+    After fit, the results use the same format as lifelines:
+        - survival_function_: DataFrame indexed by 'timeline' with the 'KM_estimate' column.
+        - cumulative_hazard_: DataFrame indexed by 'timeline' with the 'NA_estimate' column.
+        - variance_: Greenwood variance of the survival function ('KM_variance' column).
+        - event_table: 'removed', 'observed', 'censored' and 'at_risk' counts at each time.
+    """
+
+    def __init__(self):
+        self.durations = None
+        self.event_observed = None
+        self.survival_function_ = None
+        self.cumulative_hazard_ = None
+        self.variance_ = None
+        self.event_table = None
+        self._survival_step = None
+
+    def fit(self, durations, event_observed):
+        """
+        Fit the estimators.
+
+        Parameters:
+            durations (array-like): Integer durations (e.g. 'DayTrip'), non negative.
+            event_observed (array-like): 1 if the event (loss) was observed, 0 if censored.
+
+        Returns:
+            KaplanMeierEstimator: The fitted estimator.
+        """
+        values = np.asarray(durations)
+        events = np.asarray(event_observed)
+
+        days = to_integer_days(values)
+
+        self.durations = values
+        self.event_observed = events
+
+        times, censored, observed = count_events(days, events)
+        removed = censored + observed
+        at_risk, survival = survival_from_counts(removed, observed, len(values))
+
+        hazard = observed / at_risk
+        with np.errstate(divide="ignore", invalid="ignore"):
+            greenwood_terms = np.where(observed > 0, observed / (at_risk * (at_risk - observed)), 0.0)
+            variance = survival ** 2 * np.cumsum(greenwood_terms)
+
+        timeline = pd.Index(times.astype(float), name="timeline")
+        self.survival_function_ = pd.DataFrame({"KM_estimate": survival}, index=timeline)
+        self.cumulative_hazard_ = pd.DataFrame({"NA_estimate": np.cumsum(hazard)}, index=timeline)
+        self.variance_ = pd.DataFrame({"KM_variance": variance}, index=timeline)
+        self.event_table = pd.DataFrame({
+            "removed": removed,
+            "observed": observed,
+            "censored": removed - observed,
+            "at_risk": at_risk,
+        }, index=pd.Index(times.astype(float), name="event_at"))
+        self._survival_step = StepFunction(timeline, survival)
+        return self
+
+    def predict(self, times):
+        """
+        Survival probability at any time(s), the survival function being right-continuous.
+
+        Parameters:
+            times (float or array-like): Time(s) to evaluate.
+
+        Returns:
+            float or np.ndarray: Survival probability at each time.
+        """
+        if self.survival_function_ is None:
+            raise ValueError("The estimator must be fitted before predict.")
+        return self._survival_step(times)
+
+
+def to_integer_days(values):
+    """
+    Checks the durations of a fit and returns them as an int64 copy.
+
+    Parameters:
+        values (np.ndarray): Durations, integers stored as integers or floats.
+
+    Returns:
+        np.ndarray: The durations as int64.
+    """
+    if len(values) == 0:
+        raise ValueError("Cannot fit the Kaplan-Meier estimator without durations.")
+    days = values.astype(np.int64)
+    if values.dtype.kind == "f" and np.any(days != values):
+        raise ValueError("The durations must be integers.")
+    if days.min() < 0:
+        raise ValueError("The durations must be non negative.")
+    return days
+
+
+def count_events(days, events):
+    """
+    Counts the censored and observed trips of each duration with a single np.bincount.
+
+    Parameters:
+        days (np.ndarray): Integer durations, non negative (overwritten).
+        events (np.ndarray): 1 if the event was observed, 0 if censored.
+
+    Returns:
+        tuple: (times, censored, observed), the timeline is 0 followed by every observed duration,
+               as in lifelines.
+    """
+    # censored trips go to the even bins and observed ones to the odd bins
+    days <<= 1
+    days += events != 0
+    counts = np.bincount(days)
+    counts = np.pad(counts, (0, len(counts) % 2)).reshape(-1, 2)
+
+    times = np.flatnonzero(counts.sum(axis=1))
+    if times[0] != 0:
+        times = np.concatenate([[0], times])
+    return times, counts[times, 0], counts[times, 1]
+
+
+def survival_from_counts(removed, observed, n):
+    """
+    Kaplan-Meier estimate from the removed and observed counts of each time of the timeline.
+    The counts can have leading dimensions (e.g. one row per bootstrap replicate),
+    the timeline is always the last axis.
+
+    Parameters:
+        removed (np.ndarray): Trips ending at each time (censored or observed).
+        observed (np.ndarray): Trips with the event at each time.
+        n (int): Total number of trips.
+
+    Returns:
+        tuple: (at_risk, survival) arrays with the shape of the counts.
+    """
+    at_risk = n - np.cumsum(removed, axis=-1) + removed
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # nobody at risk means nothing can happen anymore
+        hazard = np.where(at_risk > 0, observed / at_risk, 0.0)
+    return at_risk, np.cumprod(1 - hazard, axis=-1)
+
+
+def trip_outcome_pmfs(durations, lost, returned):
+    """
+    Probability that a trip ends after d days by each of two competing events, S(d-) * h(d), where S
+    is the Kaplan-Meier survival of the trips (ended by either event) and h the hazard of the event
+    (the Aalen-Johansen estimate). The trips with neither event are censored.
+
+    Parameters:
+        durations (np.ndarray): Integer durations of the trips.
+        lost (np.ndarray): True for the trips ending with a loss.
+        returned (np.ndarray): True for the trips ending with a return.
+
+    Returns:
+        tuple: Probabilities of a return and of a loss after d days (np.ndarray indexed by d).
+    """
+    days = to_integer_days(np.asarray(durations))
+    lost, returned = np.asarray(lost, dtype=bool), np.asarray(returned, dtype=bool) & ~np.asarray(lost, dtype=bool)
+
+    removed = np.bincount(days)
+    lost_counts = np.bincount(days[lost], minlength=len(removed))
+    returned_counts = np.bincount(days[returned], minlength=len(removed))
+    at_risk, survival = survival_from_counts(removed, lost_counts + returned_counts, len(days))
+
+    survival_before = np.concatenate([[1.0], survival[:-1]])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returned_pmf = np.where(at_risk > 0, survival_before * returned_counts / at_risk, 0.0)
+        lost_pmf = np.where(at_risk > 0, survival_before * lost_counts / at_risk, 0.0)
+    return returned_pmf, lost_pmf
+
+
+def bootstrap_survival(durations, event_observed, n_resamples=1000, seed=None, n_workers=None, batch_size=1000):
+    """
+    Bootstrap replicates of the Kaplan-Meier survival function.
+
+    Resampling the n trips with replacement only changes how many trips fall in each
+    (duration, event) cell, so each replicate is drawn as multinomial counts over the cells
+    and the estimator is computed from the counts, without copying the trips.
+
+    The replicates are drawn in batches of batch_size, each one with its own random stream
+    spawned from seed, so the result does not depend on n_workers.
+
+    Parameters:
+        durations (array-like): Integer durations (e.g. 'DayTrip'), non negative.
+        event_observed (array-like): 1 if the event (loss) was observed, 0 if censored.
+        n_resamples (int): Number of bootstrap replicates.
+        seed (int, optional): Seed of the resampling.
+        n_workers (int, optional): When greater than 1, the batches are computed by a pool of processes.
+        batch_size (int): Number of replicates per batch.
+
+    Returns:
+        tuple: (timeline, survival, event_fraction), the timeline of KaplanMeierEstimator.fit on the
+               data, the survival of every replicate at each time, of shape (n_resamples, len(timeline)),
+               and the fraction of trips with the event in every replicate.
+    """
+    if n_resamples < 1:
+        raise ValueError("n_resamples must be at least 1.")
+
+    kmf = KaplanMeierEstimator().fit(durations, event_observed)
+    table = kmf.event_table
+    n = len(kmf.durations)
+    cell_probs = np.concatenate([table["censored"], table["observed"]]) / n
+
+    sizes = [min(batch_size, n_resamples - start) for start in range(0, n_resamples, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    batches = [(n, cell_probs, size, batch_seed) for size, batch_seed in zip(sizes, seeds)]
+
+    if n_workers is None or n_workers <= 1:
+        results = [bootstrap_batch(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(bootstrap_batch, batches))
+
+    survival = np.concatenate([batch_survival for batch_survival, _ in results])
+    event_fraction = np.concatenate([batch_fraction for _, batch_fraction in results])
+    return table.index.to_numpy(), survival, event_fraction
+
+
+def bootstrap_batch(batch):
+    """
+    Survival functions of a batch of bootstrap replicates, see bootstrap_survival.
+
+    Parameters:
+        batch (tuple): Number of trips, probabilities of the cells (censored cells then observed
+                       cells), number of replicates and np.random.SeedSequence of the batch.
+
+    Returns:
+        tuple: Survival of each replicate, of shape (replicates, times), and fraction of trips
+               with the event in each replicate.
+    """
+    n, cell_probs, size, seed = batch
+    rng = np.random.default_rng(seed)
+    weights = rng.multinomial(n, cell_probs, size=size)
+
+    censored, observed = np.split(weights, 2, axis=1)
+    _, survival = survival_from_counts(censored + observed, observed, n)
+    return survival, observed.sum(axis=1) / n
+
+
+def stratified_survival(strata, durations, event_observed):
+    """
+    Kaplan-Meier survival functions of every stratum (customer, region, container type...) at once.
+
+    The trips are sorted once by (stratum, duration, event) and every count, at-risk number and
+    survival probability is computed on the sorted keys, without fitting each stratum separately.
+    Each stratum gets the timeline of KaplanMeierEstimator.fit on its own trips.
+
+    Parameters:
+        strata (pd.Series): Stratum of each trip, its name is used as the stratum column.
+        durations (array-like): Integer durations (e.g. 'DayTrip'), non negative.
+        event_observed (array-like): 1 if the event (loss) was observed, 0 if censored.
+
+    Returns:
+        pd.DataFrame: Tidy table with one row per stratum and time, with the stratum column,
+                      'timeline', 'at_risk', 'observed' and 'KM_estimate', sorted by stratum and time.
+    """
+    days = to_integer_days(np.asarray(durations))
+    events = np.asarray(event_observed) != 0
+    codes, uniques = pd.factorize(strata, sort=True)
+    if np.any(codes < 0):
+        raise ValueError("The strata must not contain missing values.")
+
+    # one sorted pass over the (stratum, duration, event) keys
+    span = int(days.max()) + 1
+    keys, counts = np.unique((codes * span + days) * 2 + events, return_counts=True)
+    time_keys = keys >> 1
+
+    # every stratum starts at time 0, as in lifelines
+    all_keys = np.union1d(time_keys, np.arange(len(uniques)) * span)
+    positions = np.searchsorted(all_keys, time_keys)
+    removed = np.bincount(positions, weights=counts, minlength=len(all_keys)).astype(np.int64)
+    observed = np.bincount(positions, weights=counts * (keys & 1), minlength=len(all_keys)).astype(np.int64)
+    stratum_codes = all_keys // span
+
+    # at risk = trips of the stratum minus the ones removed before, from a global cumulative sum
+    removed_before = np.cumsum(removed) - removed
+    first_rows = np.searchsorted(stratum_codes, np.arange(len(uniques)))
+    at_risk = np.bincount(codes, minlength=len(uniques))[stratum_codes] - (removed_before - removed_before[first_rows][stratum_codes])
+
+    name = strata.name if getattr(strata, "name", None) is not None else "stratum"
+    table = pd.DataFrame({
+        name: uniques.take(stratum_codes),
+        "timeline": (all_keys % span).astype(float),
+        "at_risk": at_risk,
+        "observed": observed,
+    })
+    table["KM_estimate"] = pd.Series(1 - observed / at_risk).groupby(stratum_codes).cumprod().to_numpy()
+    return table
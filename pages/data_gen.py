@@ -1,8 +1,21 @@
+import os
 import streamlit as st
 import pandas as pd
-from components.DataSimulator import DataSimulator
+from components.DataSimulator import DataSimulator, SIMULATION_VERSION
 from components.DataTransformer import DataTransformer
 from utils import graph_maker
+from utils.result_cache import ResultCache, SimulationResult, make_cache_key
+
+SIMULATION_ENGINE = "vectorized"
+
+
+@st.cache_resource
+def get_result_cache():
+    """
+    Simulation results cache shared by all the sessions of the app.
+    """
+    return ResultCache(os.path.join(".cache", "simulations"), max_items=8, max_disk_bytes=2 * 1024 ** 3)
+
 
 def run_data_generation(scenario=1):
     """
@@ -49,6 +62,8 @@ def run_data_generation(scenario=1):
     if scenario == 2:
         perc_trips_observed = st.slider("Insert the Percentage of Observable Trips", min_value=0.1, max_value=1.0, value=0.5, step=0.1)
 
+    seed = st.number_input("Random Seed", min_value=0, value=42, step=1)
+
     st.markdown("""
     Setting a threshold of a reasonable minimum trip duration is important to avoid misclassifying containers that recently have started a trip when the period
     of observation ends.\n Those containers will not be considered as lost even if the recollection date will be null.\n
@@ -62,22 +77,34 @@ def run_data_generation(scenario=1):
         st.write(f"Generating data for Scenario {scenario}...")
         
         try:
-            # Initialize the DataSimulator with scenario-specific parameters
-            simulator = DataSimulator(
+            params = dict(
                 num_containers=int(num_containers),
                 days=int(days),
                 min_trip_days=int(min_trip_days),
                 scenario = scenario,
-                perc_trips_observed =perc_trips_observed
+                perc_trips_observed =perc_trips_observed,
+                seed=int(seed),
             )
 
-            # Generate data and store it in session_state
-            st.session_state.df = simulator.simulate_container_data()
+            def simulate():
+                # Initialize the DataSimulator with scenario-specific parameters
+                simulator = DataSimulator(**params)
+                df = simulator.simulate_container_data(engine=SIMULATION_ENGINE)
+                return SimulationResult(df, simulator.eval_metrics)
+
+            # Generate data (or reuse the result of the same parameters) and store it in session_state
+            # the shards set the random streams, so they are part of the key, and the version
+            # keeps the results of an older simulator stored on disk from being reused
+            cache_key = make_cache_key(version=SIMULATION_VERSION, engine=SIMULATION_ENGINE,
+                                       shard_size=DataSimulator.shard_size, **params)
+            result = get_result_cache().get_or_compute(cache_key, simulate)
+            st.session_state.simulation_result = result
+            st.session_state.df = result.df
 
             # Transform the data and store summary results in session_state
             st.session_state.transformer = DataTransformer(st.session_state.df)
 
-            summary_table, day_trip_all = st.session_state.transformer.create_summary_table(simulator.eval_metrics)
+            summary_table, day_trip_all = st.session_state.transformer.create_summary_table(result.eval_metrics)
 
             st.session_state.summary_table = summary_table
             st.session_state.day_trip_all = day_trip_all
@@ -120,18 +147,27 @@ def run_data_generation(scenario=1):
             return
 
     # Display generated data and options if data exists
-    if "df" in st.session_state:
+    if "simulation_result" in st.session_state:
         st.write("### Simulated Data")
         st.dataframe(st.session_state.df)
 
-        # Option to download the data as a CSV file
-        csv = st.session_state.df.to_csv(index=False)
-        st.download_button(
-            label="Download CSV",
-            data=csv,
-            file_name=f"simulated_container_data_scenario_{scenario}.csv",
-            mime="text/csv"
-        )
+        # Option to download the data, the file is encoded only once per result
+        result = st.session_state.simulation_result
+        download_format = st.radio("Download format", options=["CSV", "Parquet"], horizontal=True)
+        if download_format == "CSV":
+            st.download_button(
+                label="Download CSV",
+                data=result.csv_bytes,
+                file_name=f"simulated_container_data_scenario_{scenario}.csv",
+                mime="text/csv"
+            )
+        else:
+            st.download_button(
+                label="Download Parquet",
+                data=result.parquet_bytes,
+                file_name=f"simulated_container_data_scenario_{scenario}.parquet",
+                mime="application/octet-stream"
+            )
 
         # Display the summary table
         st.write("### Summary Table")
@@ -165,6 +201,7 @@ def run_data_generation(scenario=1):
                 user_threshold=min_trip_days,
             )
             st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"Figure payload: {graph_maker.figure_payload_bytes(fig) / 1024:.1f} KB")
 
             st.markdown("""
                         The previous metrics about the False positve determined by the user threshold will not impact the performance of the model.
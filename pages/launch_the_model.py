@@ -1,7 +1,8 @@
 import streamlit as st
-from components.Modeler import Modeler
-from utils.graph_maker import plot_mapped_survival, plot_available_containers
+from components.Modeler import Modeler, trips_from_aggregate
+from utils.graph_maker import plot_mapped_survival, plot_available_containers, figure_payload_bytes
 from utils.math_functions import calculate_available_containers
+from utils.trip_aggregation import display_trip_table
 
 def launch_the_model():
     st.title("Launch the Model")
@@ -31,13 +32,20 @@ def launch_the_model():
     days = st.session_state.days
     perc_days_in_trip = st.session_state.perc_days_in_trip
 
-    # Initialize the Modeler class
-    modeler = Modeler(df, prob_in_trip=perc_days_in_trip)
+    # Initialize the Modeler class, only when the generated data changes
+    # (the Kaplan-Meier fit itself is cached by Modeler across sessions),
+    # with the trips already aggregated by the data generation page
+    if st.session_state.get("modeler_data") is not df or "modeler" not in st.session_state:
+        transformer = st.session_state.get("transformer")
+        trips = trips_from_aggregate(transformer.get_trip_aggregate()) if transformer is not None and transformer.df is df else None
+        st.session_state.modeler = Modeler(df, prob_in_trip=perc_days_in_trip, trips=trips)
+        st.session_state.modeler_data = df
+    modeler = st.session_state.modeler
     st.session_state.median_trip_time = modeler.median_trip_time
 
     # Display preprocessed data
     st.subheader("Preprocessed Data")
-    st.dataframe(modeler.df)
+    st.dataframe(display_trip_table(modeler.df))
 
     # Question 1: Shrinking Rate
     st.subheader("Question 1: What is the probability of a container being lost when starting a trip (Shrinking Rate)?")
@@ -55,6 +63,8 @@ def launch_the_model():
         For example, if 3% of the containers have been lost, the survival probability at the last moment of the observed period will be 0.97.  
     """)
 
+    n_resamples = st.number_input("Bootstrap Resamples (confidence interval)", min_value=100, value=1000, step=100)
+
     if st.button("Generate Kaplan-Meier Curve"):
         st.markdown("""
         ### Kaplan-Meier Estimation
@@ -81,9 +91,16 @@ def launch_the_model():
 
         fig = plot_mapped_survival(mapped_survival , modeler.median_trip_time)
         st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"Figure payload: {figure_payload_bytes(fig) / 1024:.1f} KB")
 
         st.subheader(f"Answer: The shrinking rate is: {shrinking_rate:.4f}")
 
+        intervals = modeler.bootstrap_confidence_intervals(n_resamples=int(n_resamples), seed=0)
+        lower_rate, upper_rate = intervals["mapped_shrinking_rate"]
+        st.session_state.shrinking_rate_ci = (lower_rate, upper_rate)
+        st.markdown(f"95% bootstrap confidence interval ({int(n_resamples)} resamples of the trips): "
+                    f"**[{lower_rate:.4f}, {upper_rate:.4f}]**")
+
     # Question 2: Available Containers
     st.subheader("Question 2: How many containers are available at any given time?")
     st.markdown("""
@@ -126,21 +143,31 @@ def launch_the_model():
 
     
 
-    if st.button("Estimate Available Containers"):
+    projection_model = st.radio(
+        "Projection Model",
+        ["Constant shrinking rate", "Survival curve (time-varying hazard)"],
+        help="The survival curve model convolves the daily trip starts with the probabilities of a trip "
+             "returning or being lost after each of its days, as fitted by Kaplan-Meier."
+    )
 
+    if st.button("Estimate Available Containers"):
 
-        if st.session_state.shrinking_rate is None:
-            st.warning("Please generate Kaplan-Meier Curve first. Shrinking_rate missing")
-            return
+        if projection_model == "Constant shrinking rate":
+            if st.session_state.shrinking_rate is None:
+                st.warning("Please generate Kaplan-Meier Curve first. Shrinking_rate missing")
+                return
 
-        shrinking_rate = st.session_state.shrinking_rate
+            shrinking_rate = st.session_state.shrinking_rate
 
 
-        # we are assuming that the risk it's equally distributed for all the period.
-        adjusted_shrinking_rate =  shrinking_rate/ days * perc_days_in_trip
+            # we are assuming that the risk it's equally distributed for all the period.
+            adjusted_shrinking_rate =  shrinking_rate/ days * perc_days_in_trip
 
 
-        df_remaining_containers = calculate_available_containers(final_containers, days , adjusted_shrinking_rate  )
+            df_remaining_containers = calculate_available_containers(final_containers, days , adjusted_shrinking_rate  )
+        else:
+            df_remaining_containers = modeler.project_fleet(final_containers, max(int(days), int(final_days)))
+            st.dataframe(df_remaining_containers)
 
 
 
@@ -149,6 +176,7 @@ def launch_the_model():
         """)
         fig = plot_available_containers(df_remaining_containers, final_days)
         st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"Figure payload: {figure_payload_bytes(fig) / 1024:.1f} KB")
 
 
         filtered_row = df_remaining_containers[df_remaining_containers['Day'] == final_days]
@@ -163,6 +191,14 @@ def launch_the_model():
 
         st.subheader(f"The estimated number of containers for the given time is: {round(final_estimate)}")
 
+        if projection_model == "Constant shrinking rate" and st.session_state.get("shrinking_rate_ci") is not None and final_estimate is not None:
+            # the containers decrease with the shrinking rate, so the bounds swap
+            bounds = [
+                calculate_available_containers(final_containers, final_days, rate / days * perc_days_in_trip)['Containers'].iloc[-1]
+                for rate in reversed(st.session_state.shrinking_rate_ci)
+            ]
+            st.markdown(f"95% bootstrap confidence interval: **[{round(bounds[0])}, {round(bounds[1])}]**")
+
         st.markdown("""
         NOTE: In case you want to generate a new prediction after modifying the initial data generation parameters or the scenario,
                      please click once again the Generate Kaplan-Meier Curve to be sure of the updated results.
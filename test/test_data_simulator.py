@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+import pytest
+from components.DataSimulator import DataSimulator
+from components.SimulationCheckpoint import SimulationCheckpoint
+from utils import math_functions, panel_io
+
+
+@pytest.mark.parametrize("scenario, perc_trips_observed", [(1, 1.0), (2, 0.5)])
+def test_vectorized_engine_matches_loop(scenario, perc_trips_observed):
+    params = dict(num_containers=40, days=90, min_trip_days=20, scenario=scenario, perc_trips_observed=perc_trips_observed)
+
+    loop_df = DataSimulator(**params).simulate_container_data(engine="loop")
+    vectorized_df = DataSimulator(**params).simulate_container_data(engine="vectorized")
+
+    pd.testing.assert_frame_equal(vectorized_df, loop_df)
+
+    # several random streams, with a process pool
+    loop_simulator, parallel_simulator = DataSimulator(**params), DataSimulator(**params)
+    loop_simulator.shard_size = parallel_simulator.shard_size = 16
+    pd.testing.assert_frame_equal(parallel_simulator.simulate_container_data(n_workers=2),
+                                  loop_simulator.simulate_container_data(engine="loop"))
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        DataSimulator(10, 10, 5).simulate_container_data(engine="gpu")
+
+
+def update_fake_lost_reference(df):
+    # previous implementation, one full-frame mask per misclassified trip
+    fake_lost_trips = df[(df["RecollectingDate"].notnull()) & (df["IsLost"] == 1)][["ContainerID", "TripID"]].drop_duplicates()
+    for _, row in fake_lost_trips.iterrows():
+        df.loc[(df["ContainerID"] == row["ContainerID"]) & (df["TripID"] == row["TripID"]) & (df["IsLost"] == 1), "IsFakeLost"] = 1
+    return df
+
+
+@pytest.mark.parametrize("min_trip_days", [5, 20, 40])
+def test_update_fake_lost_matches_reference(min_trip_days):
+    simulator = DataSimulator(num_containers=60, days=120, min_trip_days=min_trip_days, seed=7)
+    raw_df = simulator._simulate_sharded(math_functions.HazardTable(simulator.get_recollecting_distribution()), n_workers=1)
+
+    expected = update_fake_lost_reference(raw_df.copy())
+    result = simulator.update_fake_lost(raw_df.copy())
+
+    assert expected["IsFakeLost"].sum() > 0
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_parallel_output_does_not_depend_on_workers():
+    frames = []
+    for n_workers in (None, 1, 3):
+        simulator = DataSimulator(num_containers=70, days=60, min_trip_days=20, seed=3)
+        simulator.shard_size = 16
+        frames.append((simulator.simulate_container_data(n_workers=n_workers), simulator.eval_metrics))
+
+    (single_df, single_metrics) = frames[0]
+    for parallel_df, parallel_metrics in frames[1:]:
+        pd.testing.assert_frame_equal(parallel_df, single_df)
+        assert parallel_metrics == single_metrics
+    assert single_df["ContainerID"].is_monotonic_increasing
+    assert single_df["ContainerID"].nunique() == 70
+
+
+def test_parquet_dataset_matches_in_memory_panel(tmp_path):
+    simulator = DataSimulator(num_containers=50, days=60, min_trip_days=20, seed=3)
+    simulator.shard_size = 16
+    expected = simulator.simulate_container_data(n_workers=1)
+    expected_metrics = simulator.eval_metrics
+
+    streamed = DataSimulator(num_containers=50, days=60, min_trip_days=20, seed=3)
+    streamed.shard_size = 16
+    streamed.write_parquet_dataset(str(tmp_path))
+
+    result = pd.concat(panel_io.iter_panel_dataset(str(tmp_path), with_total_stock=True), ignore_index=True)
+    pd.testing.assert_frame_equal(result, expected)
+    assert streamed.eval_metrics == expected_metrics
+
+
+@pytest.mark.parametrize("n_workers", [None, 1])
+def test_trip_table_rebuilds_panel(n_workers):
+    simulator = DataSimulator(num_containers=50, days=90, min_trip_days=10, seed=11)
+    simulator.shard_size = 16
+    expected = simulator.simulate_container_data(n_workers=n_workers)
+    expected_metrics = simulator.eval_metrics
+    expected_stock = simulator.daily_stock
+
+    trips = simulator.simulate_trip_table(n_workers=n_workers)
+    assert simulator.eval_metrics == expected_metrics
+    pd.testing.assert_series_equal(simulator.daily_stock, expected_stock)
+    assert (expected_stock.to_numpy() == expected.groupby("ActualDate")["TotalStock"].first().to_numpy()).all()
+    assert len(trips) == expected.groupby(["ContainerID", "TripID"]).ngroups
+
+    pd.testing.assert_frame_equal(simulator.trips_to_panel(trips), expected)
+
+
+def test_extend_matches_longer_simulation(tmp_path):
+    full_simulator = DataSimulator(num_containers=70, days=100, min_trip_days=15, seed=9)
+    full_simulator.shard_size = 16
+    expected = full_simulator.simulate_container_data(n_workers=1)
+
+    simulator = DataSimulator(num_containers=70, days=40, min_trip_days=15, seed=9)
+    simulator.shard_size = 16
+    df = simulator.simulate_container_data(n_workers=1)
+    df = simulator.extend(df, 25)
+
+    # resume from a saved checkpoint
+    simulator.checkpoint.save(tmp_path / "checkpoint.pkl")
+    simulator.checkpoint = SimulationCheckpoint.load(tmp_path / "checkpoint.pkl")
+    df = simulator.extend(df, 35)
+
+    pd.testing.assert_frame_equal(df.sort_values(["ContainerID", "ActualDate"], ignore_index=True), expected)
+    pd.testing.assert_series_equal(simulator.daily_stock, full_simulator.daily_stock)
+    assert simulator.eval_metrics == full_simulator.eval_metrics
+    assert simulator.days == 100
+
+
+def test_extend_leaves_the_panel_unchanged():
+    simulator = DataSimulator(300, 60, 15)
+    df = simulator.simulate_container_data()
+    original = df.copy()
+    extended = simulator.extend(df, 30)
+
+    pd.testing.assert_frame_equal(df, original)
+    assert len(extended) == 300 * 90
+    # a panel whose rows do not follow the checkpoint is refused
+    with pytest.raises(ValueError, match="rows"):
+        simulator.extend(extended.iloc[:-1], 10)
+
+
+def test_extend_segments_matches_extend():
+    simulator = DataSimulator(num_containers=70, days=40, min_trip_days=15, seed=9)
+    simulator.shard_size = 16
+    segments = [simulator.simulate_container_data()]
+    expected_simulator = DataSimulator(num_containers=70, days=40, min_trip_days=15, seed=9)
+    expected_simulator.shard_size = 16
+    expected = expected_simulator.simulate_container_data()
+
+    for days in (25, 35):
+        segments = simulator.extend_segments(segments, days)
+        expected = expected_simulator.extend(expected, days)
+
+    assert len(segments) == 3
+    pd.testing.assert_frame_equal(pd.concat(segments, ignore_index=True), expected)
+    assert simulator.eval_metrics == expected_simulator.eval_metrics
+
+
+def test_threshold_curve_matches_simulations_per_threshold():
+    simulator = DataSimulator(200, 100, 20)
+    simulator.simulate_container_data(engine="loop")
+    curve = simulator.threshold_curve([0, 10, 20, 45])
+    stock = simulator.daily_stock_by_threshold([0, 10, 20, 45])
+
+    for row in curve.itertuples():
+        expected = DataSimulator(200, 100, row.min_trip_days)
+        panel = expected.simulate_container_data()
+
+        assert (row.true_positives, row.false_positives) == expected.lost_classification
+        assert row.precision_treshold == pytest.approx(expected.eval_metrics["precision_treshold"])
+        assert row.F1_Score_threshold == pytest.approx(expected.eval_metrics["F1_Score_threshold"])
+        assert (stock[row.min_trip_days].to_numpy() == expected.daily_stock.to_numpy()).all()
+
+        trips = simulator.relabel(row.min_trip_days)
+        assert simulator.eval_metrics == expected.eval_metrics
+        pd.testing.assert_frame_equal(simulator.trips_to_panel(trips), panel)
+
+
+def test_threshold_curve_from_panel_matches_raw_trips():
+    simulator = DataSimulator(150, 120, 20, scenario=2, perc_trips_observed=0.5)
+    panel = simulator.simulate_container_data()
+    thresholds = np.arange(0, 60, 5)
+    lost_classification = simulator.lost_classification
+
+    curve = simulator.calculate_fake_lost_percentage(panel, thresholds)
+    pd.testing.assert_frame_equal(curve, simulator.threshold_curve(thresholds))
+    # the curve of the simulated threshold gives the counts of the panel rows
+    row = curve.loc[curve["min_trip_days"] == 20].iloc[0]
+    assert (row["true_positives"], row["false_positives"]) == lost_classification
+
+
+def test_relabel_drops_the_checkpoint():
+    simulator = DataSimulator(60, 40, 10)
+    df = simulator.simulate_container_data()
+    simulator.relabel(25)
+    with pytest.raises(ValueError):
+        simulator.extend(df, 5)
+
+    # a checkpoint of another threshold is refused
+    simulator = DataSimulator(60, 40, 10)
+    df = simulator.simulate_container_data()
+    simulator.min_trip_days = 25
+    with pytest.raises(ValueError, match="min_trip_days"):
+        simulator.extend(df, 5)
+
+
+def test_chunked_simulation_resets_the_last_simulation():
+    simulator = DataSimulator(60, 40, 10)
+    simulator.simulate_container_data()
+    simulator.seed = 5
+    for _ in simulator.iter_container_data():
+        pass
+
+    assert simulator.checkpoint is None
+    expected = DataSimulator(60, 40, 10, seed=5)
+    expected.simulate_container_data()
+    pd.testing.assert_frame_equal(simulator.threshold_curve([10, 20]), expected.threshold_curve([10, 20]))
+
+
+def test_relabel_after_parallel_mode():
+    simulator = DataSimulator(120, 60, 10)
+    simulator.simulate_container_data(n_workers=1)
+    simulator.relabel(25)
+
+    expected = DataSimulator(120, 60, 25)
+    expected.simulate_container_data(n_workers=1)
+    assert simulator.eval_metrics == expected.eval_metrics
+    assert simulator.daily_stock.equals(expected.daily_stock)
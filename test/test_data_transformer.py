@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+from components.DataSimulator import DataSimulator
+from components.DataTransformer import DataTransformer, summarize_chunks
+from components import DataTransformer as DataTransformer_module, Modeler as Modeler_module
+from components.Modeler import Modeler, trips_from_aggregate
+from utils import trip_aggregation
+
+
+@pytest.fixture(scope="module")
+def simulator():
+    simulator = DataSimulator(num_containers=120, days=90, min_trip_days=20)
+    simulator.shard_size = 25
+    return simulator
+
+
+def test_summary_of_chunks_matches_whole_panel(simulator):
+    df = simulator.simulate_container_data(n_workers=1)
+    summary, day_trip_all = DataTransformer(df).create_summary_table(simulator.eval_metrics)
+
+    # reference: the KPIs computed directly on the panel
+    day_trip = df.groupby(["ContainerID", "TripID"])["DayTrip"].max()
+    assert summary.loc[0, "Percentage Days in Trip"] == df["StartingDate"].notnull().mean()
+    assert summary.loc[0, "Median trip duration"] == day_trip.median()
+    assert summary.loc[0, "Average trip duration"] == pytest.approx(day_trip.mean())
+    assert summary.loc[0, "Variance trip duration"] == pytest.approx(day_trip.var())
+    pd.testing.assert_series_equal(day_trip_all, day_trip)
+
+    chunked_summary, chunked_day_trip = summarize_chunks(simulator.iter_container_data(), simulator.eval_metrics)
+    pd.testing.assert_frame_equal(chunked_summary, summary)
+    pd.testing.assert_series_equal(chunked_day_trip, day_trip_all)
+
+
+def test_transformer_and_modeler_share_the_trip_aggregation(simulator, monkeypatch):
+    df = simulator.simulate_container_data()
+    calls = []
+    aggregate = trip_aggregation.aggregate_panel_trips
+    counted = lambda *args: calls.append(1) or aggregate(*args)
+    monkeypatch.setattr(DataTransformer_module, "aggregate_panel_trips", counted)
+    monkeypatch.setattr(Modeler_module, "aggregate_panel_trips", counted)
+
+    transformer = DataTransformer(df)
+    transformer.create_summary_table(simulator.eval_metrics)
+    modeler = Modeler(df, prob_in_trip=0.5, trips=trips_from_aggregate(transformer.get_trip_aggregate()))
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(modeler.df, Modeler(df, prob_in_trip=0.5).df)
+
+
+def test_modeler_sees_the_panel_extended_in_place():
+    simulator = DataSimulator(300, 60, 15)
+    df = simulator.simulate_container_data()
+    Modeler(df, prob_in_trip=0.5)
+    simulator.extend_segments([df], 30)
+    fresh = df.copy()
+    assert Modeler(df, prob_in_trip=0.5).df["IsLost"].sum() == Modeler(fresh, prob_in_trip=0.5).df["IsLost"].sum()
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from utils import graph_maker
+
+
+def test_bin_values_counts_every_value():
+    values = pd.Series(np.random.default_rng(0).integers(1, 200, 10_000), dtype=float)
+    edges, counts = graph_maker.bin_values(values, nbins=30)
+
+    assert len(counts) <= 30 and len(edges) == len(counts) + 1
+    assert counts.sum() == len(values)
+    # whole days per bin
+    assert np.allclose(np.diff(edges), np.diff(edges)[0]) and edges[0] == 0.5
+
+
+def test_histogram_payload_does_not_grow_with_trips():
+    small = graph_maker.plot_histogram_with_thresholds(pd.Series(np.arange(1, 101, dtype=float)), 20)
+    large = graph_maker.plot_histogram_with_thresholds(pd.Series(np.tile(np.arange(1, 101, dtype=float), 1000)), 20)
+    assert len(large.data[0].x) == len(small.data[0].x)
+    assert graph_maker.figure_payload_bytes(large) < 1.1 * graph_maker.figure_payload_bytes(small)
+
+
+def test_drop_redundant_points_keeps_steps():
+    x, y = graph_maker.drop_redundant_points(np.arange(8), np.array([1, 1, 1, 0.5, 0.5, 0.5, 0.5, 0.2]))
+    assert list(x) == [0, 2, 3, 6, 7]
+    assert list(y) == [1, 1, 0.5, 0.5, 0.2]
+
+
+def test_lttb_keeps_ends_and_peaks():
+    x = np.arange(10_000)
+    y = np.zeros(len(x))
+    y[4321] = 5.0
+    kept_x, kept_y = graph_maker.lttb(x, y, 100)
+
+    assert len(kept_x) == 100
+    assert kept_x[0] == 0 and kept_x[-1] == len(x) - 1
+    assert np.all(np.diff(kept_x) > 0)
+    assert 4321 in kept_x
+
+
+def test_curve_plots_are_downsampled():
+    survival = pd.DataFrame({"KM_estimate": np.linspace(1, 0, 50_000)})
+    fig = graph_maker.plot_kaplan_meier(survival, max_points=500)
+    report = graph_maker.payload_report({"km": fig})
+
+    assert report.loc[0, "points"] == 500
+    assert report.loc[0, "bytes"] == graph_maker.figure_payload_bytes(fig)
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+from utils import math_functions
+
+
+def test_hazard_table_matches_get_lognorm_pdf():
+    distribution = math_functions.get_lognorm_distribution(mean=4.1, sigma=0.4)
+    hazard_table = math_functions.HazardTable(distribution)
+    days = np.arange(0, 400)
+
+    expected = [math_functions.get_lognorm_PDF(distribution, day, scaling_factor=2) for day in days]
+
+    assert np.array_equal(hazard_table.get_pdf(days, scaling_factor=2), expected)
+    assert hazard_table.get_pdf(350) == math_functions.get_lognorm_PDF(distribution, 300)
+    assert hazard_table.get_pdf(3.0) == hazard_table.get_pdf(3)
+    assert np.array_equal(hazard_table.get_pdf(np.array([2.6, 4.2])), hazard_table.get_pdf(np.array([3, 4])))
+
+
+def test_available_containers_matches_daily_recurrence():
+    result = math_functions.calculate_available_containers(1000, 365, 0.002)
+
+    expected = []
+    current_containers = 1000
+    for _ in range(365):
+        current_containers -= current_containers * 0.002
+        expected.append(current_containers)
+
+    assert list(result["Day"]) == list(range(1, 366))
+    np.testing.assert_allclose(result["Containers"], expected, rtol=1e-12)
+    assert (math_functions.calculate_available_containers(10, 5, 1.5)["Containers"] == 0).all()
+
+
+def test_available_containers_grid_of_scenarios():
+    initial = np.array([100, 200, 300])
+    probabilities = np.array([0.0, 0.01, 0.05])
+    grid = math_functions.calculate_available_containers(initial, 30, probabilities)
+
+    assert grid.shape == (3, 30)
+    for row, (containers, probability) in enumerate(zip(initial, probabilities)):
+        expected = math_functions.calculate_available_containers(containers, 30, probability)["Containers"]
+        np.testing.assert_allclose(grid[row], expected)
+
+
+def test_trip_flows_match_day_by_day_renewal():
+    durations = np.arange(60)
+    returned_pmf = np.where(durations > 0, np.exp(-((durations - 20) / 6.0) ** 2), 0)
+    returned_pmf *= 0.9 / returned_pmf.sum()
+    lost_pmf = np.where(durations > 25, 0.1 / 34, 0)
+    initial, start_rate, days = 1000.0, 0.3, 200
+
+    flows = math_functions.project_trip_flows(initial, days, returned_pmf, lost_pmf, start_rate=start_rate)
+
+    # reference: every day the idle containers start trips with probability start_rate
+    ended = np.cumsum(np.pad(returned_pmf + lost_pmf, (0, days)))
+    lost_by_age = np.cumsum(np.pad(lost_pmf, (0, days)))
+    starts = []
+    for day in range(days):
+        ages = day - np.arange(day)
+        busy = sum(started * (1 - ended[age] + lost_by_age[age]) for started, age in zip(starts, ages))
+        starts.append(start_rate * (initial - busy))
+
+    np.testing.assert_allclose(flows["Starts"], starts, rtol=1e-9)
+    np.testing.assert_allclose(flows["Idle"] + flows["InTrip"] + flows["Lost"], initial)
+    np.testing.assert_allclose(flows["Containers"], initial - flows["Lost"])
+
+    given = math_functions.project_trip_flows(initial, days, returned_pmf, lost_pmf, starts=flows["Starts"])
+    pd.testing.assert_frame_equal(given, flows)
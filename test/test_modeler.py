@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from components.DataSimulator import DataSimulator
+from components.Modeler import Modeler
+
+
+@pytest.fixture(scope="module")
+def simulated_df():
+    return DataSimulator(num_containers=200, days=120, min_trip_days=20).simulate_container_data()
+
+
+def test_kaplan_meier_is_fitted_once_per_trip_table(simulated_df):
+    modeler = Modeler(simulated_df, prob_in_trip=0.5)
+    kmf = modeler.kaplan_meier_fitter()
+
+    # same data in another Modeler (e.g. another Streamlit rerun) reuses the fit
+    assert Modeler(simulated_df, prob_in_trip=0.5).kaplan_meier_fitter() is kmf
+
+    modeler.df = modeler.df.iloc[: len(modeler.df) // 2]
+    refitted = modeler.kaplan_meier_fitter()
+    assert refitted is not kmf
+    assert refitted.event_observed.sum() == modeler.df["IsLost"].sum()
+
+
+def test_bootstrap_intervals_contain_the_estimates(simulated_df):
+    modeler = Modeler(simulated_df, prob_in_trip=0.5)
+    intervals = modeler.bootstrap_confidence_intervals(n_resamples=500, initial_containers=200, seed=0)
+
+    lower, upper = intervals["shrinking_rate"]
+    assert lower <= modeler.shrinking_rate_at_median() <= upper
+
+    mapped = modeler.mapped_survival_function()
+    lower, upper = intervals["mapped_shrinking_rate"]
+    assert lower <= 1 - modeler.get_km_estimate_at_timeline(mapped) <= upper
+
+    available = modeler.calculate_available_containers(200)
+    band = intervals["available_containers"]
+    assert ((band["lower"] <= available + 1e-9) & (available <= band["upper"] + 1e-9)).all()
+
+
+def test_shrinking_rate_by_stratum_matches_separate_modelers(simulated_df):
+    df = simulated_df.assign(Region=np.where(simulated_df["ContainerID"] % 2 == 0, "even", "odd"))
+    rates = Modeler(df, prob_in_trip=0.5, strata=["Region"]).shrinking_rate_by_stratum("Region")
+
+    assert list(rates["Region"]) == ["even", "odd"]
+    for row in rates.itertuples():
+        modeler = Modeler(df[df["Region"] == row.Region], prob_in_trip=0.5)
+        assert row.trips == len(modeler.df)
+        assert row.shrinking_rate == pytest.approx(modeler.shrinking_rate_at_median())
+
+
+def test_km_estimate_at_any_timeline(simulated_df):
+    modeler = Modeler(simulated_df, prob_in_trip=0.5)
+    survival_function = modeler.kaplan_meier_fitter().survival_function_
+
+    # a time between two observed durations takes the value of the previous one
+    known = survival_function.index[5]
+    assert modeler.get_km_estimate_at_specific_timeline(known + 0.5, survival_function) == survival_function["KM_estimate"].iloc[5]
+
+    modeler.median_trip_time += 0.5
+    assert 0 < modeler.get_km_estimate_at_timeline(survival_function) <= 1
+
+    estimates = modeler.get_km_estimate_at_specific_timeline(survival_function.index.to_numpy(), survival_function)
+    np.testing.assert_array_equal(estimates, survival_function["KM_estimate"].to_numpy())
+
+
+def test_fleet_projection_keeps_the_containers(simulated_df):
+    modeler = Modeler(simulated_df, prob_in_trip=0.5)
+    flows = modeler.project_fleet(1000, 365)
+
+    assert len(flows) == 365
+    np.testing.assert_allclose(flows["Idle"] + flows["InTrip"] + flows["Lost"], 1000)
+    assert flows["Lost"].is_monotonic_increasing
+    # every trip ends, returned or lost, with the probabilities of the trip table
+    assert flows["Returned"].sum() + flows["Lost"].iloc[-1] <= flows["Starts"].sum() + 1e-6
+
+
+def test_fleet_projection_matches_the_simulated_stock():
+    simulator = DataSimulator(num_containers=2000, days=200, min_trip_days=20)
+    df = simulator.simulate_container_data()
+    modeler = Modeler(df, prob_in_trip=df["StartingDate"].notnull().mean())
+
+    flows = modeler.project_fleet(2000, 200)
+    simulated_lost = 2000 - simulator.daily_stock.to_numpy()
+    for day in (30, 100, 199):
+        assert flows["Lost"].iloc[day] == pytest.approx(simulated_lost[day], rel=0.05)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.DataSimulator import DataSimulator
+from utils import panel_schema
+
+
+@pytest.fixture(scope="module")
+def panel():
+    simulator = DataSimulator(200, 120, 20)
+    return simulator.simulate_container_data(), simulator.start_date
+
+
+def test_compact_round_trip(panel):
+    df, start_date = panel
+    compact = panel_schema.to_compact(df, start_date)
+    panel_schema.validate_compact(compact)
+    pd.testing.assert_frame_equal(panel_schema.from_compact(compact), df)
+
+
+def test_memory_report_reduction(panel):
+    df, start_date = panel
+    report = panel_schema.memory_report(df, start_date=start_date)
+    assert report.loc["Total", "reduction"] >= 4
+    assert (report["saved_bytes"] > 0).all()
+
+
+def test_offsets_to_dates():
+    offsets = pd.array([0, None, 31], dtype=panel_schema.nullable_uint16())
+    dates = panel_schema.offsets_to_dates(offsets, "2023-01-01")
+    assert dates[0] == pd.Timestamp("2023-01-01")
+    assert pd.isna(dates[1])
+    assert dates[2] == pd.Timestamp("2023-02-01")
+
+
+def test_validate_compact_rejects_public_dtypes(panel):
+    df, _ = panel
+    with pytest.raises(ValueError, match="StartingDate"):
+        panel_schema.validate_compact(df)
+
+
+def test_to_compact_checks_range():
+    df = pd.DataFrame({"ContainerID": [1], "ActualDate": pd.to_datetime(["2023-01-01"]), "DayTrip": [np.float64(70000)]})
+    with pytest.raises(ValueError, match="DayTrip"):
+        panel_schema.to_compact(df, "2023-01-01")
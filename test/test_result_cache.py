@@ -0,0 +1,45 @@
+import pandas as pd
+from utils.result_cache import ResultCache, SimulationResult, make_cache_key
+
+
+def make_result(value):
+    df = pd.DataFrame({"ContainerID": [1, 2], "ActualDate": pd.to_datetime(["2023-01-01", "2023-01-02"]), "IsLost": [0, value]})
+    return SimulationResult(df, {"precision_treshold": value})
+
+
+def test_disk_tier_survives_memory_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path), max_items=1)
+    cache.put("a", make_result(0))
+    cache.put("b", make_result(1))
+
+    result = ResultCache(str(tmp_path)).get("a")
+    pd.testing.assert_frame_equal(result.df, make_result(0).df)
+    assert result.eval_metrics == {"precision_treshold": 0}
+
+
+def test_disk_tier_is_evicted_by_size(tmp_path):
+    cache = ResultCache(str(tmp_path), max_items=1, max_disk_bytes=1)
+    cache.put("a", make_result(0))
+    cache.put("b", make_result(1))
+
+    assert cache.get("a") is None
+    assert cache.get("b").eval_metrics == {"precision_treshold": 1}
+
+
+def test_get_or_compute_reuses_result(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    calls = []
+    key = make_cache_key(num_containers=10, days=5, seed=42)
+
+    def compute():
+        calls.append(1)
+        return make_result(1)
+
+    first = cache.get_or_compute(key, compute)
+    second = cache.get_or_compute(key, compute)
+
+    assert len(calls) == 1
+    assert first is second
+    assert first.csv_bytes is second.csv_bytes
+    assert key != make_cache_key(num_containers=10, days=5, seed=43)
+    assert key != make_cache_key(num_containers=10, days=5, seed=42, version=2)
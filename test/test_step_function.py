@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+from components.StepFunction import StepFunction
+
+
+@pytest.fixture
+def survival():
+    return StepFunction([0.0, 2.0, 5.0], [1.0, 0.8, 0.5])
+
+
+def test_right_continuous_lookup(survival):
+    assert survival(2.0) == 0.8
+    assert survival(1.999) == 1.0
+    assert survival(3.5) == 0.8
+    assert survival(100) == 0.5
+    assert survival(-1) == 1.0
+
+
+def test_array_lookup_matches_scalars(survival):
+    times = np.array([[0, 1.5, 2], [4.9, 5, np.nan]])
+    expected = np.array([[1.0, 1.0, 0.8], [0.8, 0.5, np.nan]])
+    np.testing.assert_array_equal(survival(times), expected)
+
+
+def test_from_frame_and_validation():
+    frame = pd.DataFrame({"KM_estimate": [1.0, 0.9]}, index=pd.Index([0.0, 3.0], name="timeline"))
+    assert StepFunction.from_frame(frame)(3.2) == 0.9
+
+    with pytest.raises(ValueError):
+        StepFunction([0.0, 3.0, 1.0], [1.0, 0.9, 0.8])
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.streaming_stats import RunningStats
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1000])
+def test_running_stats_match_pandas_over_batches(size):
+    values = pd.Series(np.random.default_rng(size).integers(1, 200, size).astype(float))
+    stats = RunningStats()
+    for batch in np.array_split(values.to_numpy(), 5):
+        stats.update(batch)
+
+    assert stats.count == size
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.median == values.median()
+    if size > 1:
+        assert stats.variance == pytest.approx(values.var())
+    else:
+        assert np.isnan(stats.variance)
+
+
+def test_running_stats_reject_non_integers():
+    with pytest.raises(ValueError):
+        RunningStats().update([1.5])
+    assert np.isnan(RunningStats().update([np.nan]).median)
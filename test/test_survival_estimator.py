@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+from lifelines import KaplanMeierFitter, NelsonAalenFitter
+from components.SurvivalEstimator import KaplanMeierEstimator, bootstrap_survival, stratified_survival, trip_outcome_pmfs
+
+
+@pytest.fixture(scope="module")
+def trips():
+    rng = np.random.default_rng(0)
+    durations = pd.Series(rng.integers(1, 120, 5000).astype(float), name="DayTrip")
+    events = pd.Series((rng.random(5000) < 0.15).astype(int), name="IsLost")
+    return durations, events
+
+
+def test_survival_function_matches_lifelines(trips):
+    durations, events = trips
+    expected = KaplanMeierFitter().fit(durations, event_observed=events)
+    result = KaplanMeierEstimator().fit(durations, event_observed=events)
+
+    pd.testing.assert_frame_equal(result.survival_function_, expected.survival_function_, check_exact=False, rtol=1e-10)
+    pd.testing.assert_frame_equal(result.event_table, expected.event_table.drop(columns="entrance"), check_dtype=False)
+
+    # Greenwood variance, the one used by lifelines for its confidence intervals
+    greenwood = expected.survival_function_["KM_estimate"] ** 2 * expected._cumulative_sq_
+    np.testing.assert_allclose(result.variance_["KM_variance"].to_numpy(), greenwood.to_numpy())
+
+
+def test_cumulative_hazard_matches_lifelines(trips):
+    durations, events = trips
+    expected = NelsonAalenFitter(nelson_aalen_smoothing=False).fit(durations, event_observed=events)
+    result = KaplanMeierEstimator().fit(durations, event_observed=events)
+
+    pd.testing.assert_frame_equal(result.cumulative_hazard_, expected.cumulative_hazard_, check_exact=False, rtol=1e-10)
+
+
+def test_rejects_non_integer_durations():
+    with pytest.raises(ValueError):
+        KaplanMeierEstimator().fit([1.5, 2.0], [0, 1])
+
+
+def test_bootstrap_matches_greenwood_and_ignores_batching(trips):
+    durations, events = trips
+    kmf = KaplanMeierEstimator().fit(durations, event_observed=events)
+    timeline, survival, lost_fraction = bootstrap_survival(durations, events, n_resamples=2000, seed=1)
+
+    np.testing.assert_array_equal(timeline, kmf.survival_function_.index.to_numpy())
+    assert survival.shape == (2000, len(timeline))
+    np.testing.assert_allclose(survival.mean(axis=0), kmf.survival_function_["KM_estimate"], atol=0.01)
+    # the bootstrap standard error agrees with the Greenwood formula
+    np.testing.assert_allclose(survival.std(axis=0)[1:80], np.sqrt(kmf.variance_["KM_variance"].to_numpy())[1:80], rtol=0.15)
+    assert abs(lost_fraction.mean() - events.mean()) < 0.005
+
+    _, same_survival, _ = bootstrap_survival(durations, events, n_resamples=2000, seed=1, n_workers=2)
+    np.testing.assert_array_equal(same_survival, survival)
+
+
+def test_stratified_survival_matches_separate_fits(trips):
+    durations, events = trips
+    strata = pd.Series(np.arange(len(durations)) % 7, name="Region").map(lambda code: f"region_{code}")
+    table = stratified_survival(strata, durations, events)
+
+    assert list(table.columns) == ["Region", "timeline", "at_risk", "observed", "KM_estimate"]
+    for region, stratum in table.groupby("Region"):
+        mask = (strata == region).to_numpy()
+        expected = KaplanMeierEstimator().fit(durations[mask], events[mask])
+        np.testing.assert_array_equal(stratum["timeline"], expected.survival_function_.index)
+        np.testing.assert_array_equal(stratum["at_risk"], expected.event_table["at_risk"])
+        np.testing.assert_allclose(stratum["KM_estimate"], expected.survival_function_["KM_estimate"])
+
+
+def test_predict_between_observed_times(trips):
+    durations, events = trips
+    kmf = KaplanMeierEstimator().fit(durations, event_observed=events)
+    expected = KaplanMeierFitter().fit(durations, event_observed=events)
+
+    times = np.array([0.5, 10.25, 57.9, 500.0])
+    np.testing.assert_allclose(kmf.predict(times), expected.predict(times).to_numpy())
+
+
+def test_trip_outcome_pmfs_censor_the_running_trips():
+    durations = np.array([2, 2, 3, 3, 5])
+    lost = np.array([False, False, True, False, False])
+    returned = np.array([True, False, False, True, True])
+    returned_pmf, lost_pmf = trip_outcome_pmfs(durations, lost, returned)
+
+    # the trip running at day 2 is censored: the 3 trips left share the remaining 4/5
+    np.testing.assert_allclose(returned_pmf, [0, 0, 0.2, 0.8 / 3, 0, 0.8 / 3])
+    np.testing.assert_allclose(lost_pmf, [0, 0, 0, 0.8 / 3, 0, 0])
+    assert returned_pmf.sum() + lost_pmf.sum() == pytest.approx(1)
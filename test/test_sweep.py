@@ -0,0 +1,26 @@
+import pytest
+from components.DataSimulator import DataSimulator
+from components.Modeler import Modeler
+from utils import sweep
+
+
+def test_sweep_matches_the_pages_pipeline():
+    grid = sweep.make_grid(min_trip_days=[15, 25], perc_trips_observed=[0.5], num_containers=[150], days=[120], scenario=[2])
+    results = sweep.run_sweep(grid, n_workers=2)
+
+    assert len(results) == 2
+    for row in results.itertuples():
+        simulator = DataSimulator(150, 120, row.min_trip_days, scenario=2, perc_trips_observed=0.5)
+        df = simulator.simulate_container_data()
+
+        assert row.precision_treshold == pytest.approx(simulator.eval_metrics["precision_treshold"])
+        assert row.F1_Score_threshold == pytest.approx(simulator.eval_metrics["F1_Score_threshold"])
+        assert row.shrinking_rate == pytest.approx(Modeler(df, prob_in_trip=1).shrinking_rate_at_median())
+
+
+def test_cli_writes_the_results(tmp_path):
+    output = tmp_path / "sweep.csv"
+    sweep.main(["--min-trip-days", "10", "20", "--num-containers", "50", "--days", "60", "--seed", "1", "2",
+                "--output", str(output)])
+
+    assert output.read_text().count("\n") == 5
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+from utils import trip_aggregation
+
+
+def test_trip_key_round_trip_keeps_the_order():
+    container_id = np.array([1, 1, 2, 10, 70000])
+    trip_id = np.array([1.0, 12.0, 1.0, 3.0, 400.0])
+    keys = trip_aggregation.pack_trip_key(container_id, trip_id)
+
+    assert keys.dtype == np.int64
+    assert (np.diff(keys) > 0).all()
+    unpacked_container, unpacked_trip = trip_aggregation.unpack_trip_key(keys)
+    np.testing.assert_array_equal(unpacked_container, container_id)
+    np.testing.assert_array_equal(unpacked_trip, trip_id)
+    assert list(trip_aggregation.format_trip_key(keys)) == ["1_1", "1_12", "2_1", "10_3", "70000_400"]
+
+
+def test_display_trip_table_renders_the_key():
+    trips = pd.DataFrame({"TripKey": trip_aggregation.pack_trip_key([3], [2]), "DayTrip": [4.0], "IsLost": [0]})
+    display = trip_aggregation.display_trip_table(trips)
+    assert list(display.columns) == ["UniqueTripID", "DayTrip", "IsLost"]
+    assert display.loc[0, "UniqueTripID"] == "3_2"
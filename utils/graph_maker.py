@@ -1,20 +1,159 @@
-import plotly.express as px
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
 
-def plot_histogram_with_thresholds(series, user_threshold):
+
+# Largest number of points sent to the browser for each curve
+MAX_CURVE_POINTS = 2000
+
+
+def bin_values(values, nbins=30):
+    """
+    Counts the values in bins on the server, so a histogram only sends its bins to the browser.
+    Integer values (e.g. trip durations in days) are counted with bincount and binned on whole days.
+
+    Parameters:
+        values (array-like): The data of the histogram, missing values are ignored.
+        nbins (int): Maximum number of bins.
+
+    Returns:
+        tuple: Edges (np.ndarray, nbins + 1 values) and counts (np.ndarray) of the bins.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.array([0.0, 1.0]), np.zeros(1, dtype=np.int64)
+
+    integers = values.astype(np.int64)
+    if np.all(integers == values):
+        low = integers.min()
+        counts_per_value = np.bincount(integers - low)
+        width = -(-len(counts_per_value) // nbins)
+        counts = np.add.reduceat(counts_per_value, np.arange(0, len(counts_per_value), width))
+        edges = low + width * np.arange(len(counts) + 1) - 0.5
+        return edges.astype(float), counts
+
+    counts, edges = np.histogram(values, bins=nbins)
+    return edges, counts
+
+
+def drop_redundant_points(x, y):
+    """
+    Removes the points of a curve lying inside a constant run (same y as both neighbours),
+    which does not change the drawn line. A step curve keeps two points per step.
+
+    Returns:
+        tuple: x and y of the kept points (np.ndarray).
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    if len(y) <= 2:
+        return x, y
+    keep = np.ones(len(y), dtype=bool)
+    keep[1:-1] = (y[1:-1] != y[:-2]) | (y[1:-1] != y[2:])
+    return x[keep], y[keep]
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling: keeps the first and last points and, in each
+    of n_out - 2 buckets, the point forming the largest triangle with the point kept in the
+    previous bucket and the mean of the next bucket.
+
+    Parameters:
+        x, y (array-like): The curve, sorted by x.
+        n_out (int): Number of points kept.
+
+    Returns:
+        tuple: x and y of the kept points (np.ndarray).
     """
-    Plots a histogram with two threshold lines using Plotly Express.
+    x, y = np.asarray(x), np.asarray(y)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    xf, yf = x.astype(float), y.astype(float)
+    # bucket limits of the points between the first and the last one
+    limits = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+
+    for bucket in range(n_out - 2):
+        start, end = limits[bucket], limits[bucket + 1]
+        next_end = limits[bucket + 2] if bucket + 2 < len(limits) else n
+        next_x, next_y = xf[end:next_end].mean(), yf[end:next_end].mean()
+        previous = kept[bucket]
+
+        area = np.abs((xf[previous] - next_x) * (yf[start:end] - yf[previous])
+                      - (xf[previous] - xf[start:end]) * (next_y - yf[previous]))
+        kept[bucket + 1] = start + np.argmax(area)
+
+    return x[kept], y[kept]
+
+
+def downsample_curve(x, y, max_points=MAX_CURVE_POINTS):
+    """
+    Reduces a curve before plotting: the points inside constant runs are dropped, then LTTB
+    is applied if more than max_points are left.
+
+    Returns:
+        tuple: x and y of the kept points (np.ndarray).
+    """
+    x, y = drop_redundant_points(x, y)
+    if max_points is not None and len(x) > max_points:
+        x, y = lttb(x, y, max_points)
+    return x, y
+
+
+def figure_payload_bytes(fig):
+    """
+    Size of the JSON of a figure, i.e. what Streamlit sends to the browser.
+    """
+    return len(fig.to_json().encode("utf-8"))
+
+
+def payload_report(figures):
+    """
+    Payload of several figures.
+
+    Parameters:
+        figures (dict): Figures by name.
+
+    Returns:
+        pd.DataFrame: Traces, points and JSON bytes of each figure.
+    """
+    return pd.DataFrame([
+        {
+            "figure": name,
+            "traces": len(fig.data),
+            "points": sum(len(trace.x) for trace in fig.data if trace.x is not None),
+            "bytes": figure_payload_bytes(fig),
+        }
+        for name, fig in figures.items()
+    ])
+
+
+def plot_histogram_with_thresholds(series, user_threshold, nbins=30):
+    """
+    Plots a histogram with a threshold line. The bins are counted on the server (see bin_values),
+    so the figure holds nbins bars whatever the number of trips.
 
     Parameters:
         series (pd.Series): The data to be plotted as a histogram.
         user_threshold (float): The value for the user threshold line.
+        nbins (int): Maximum number of bins.
 
 
     Returns:
         plotly.graph_objects.Figure: The Plotly figure with the histogram and thresholds.
     """
-    # Create the histogram using Plotly Express
-    fig = px.histogram(series, x=series, nbins=30, title="Histogram Of the duration of trips")
+    edges, counts = bin_values(series, nbins)
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        name="count"
+    ))
+    fig.update_layout(title="Histogram Of the duration of trips", bargap=0)
 
     # Add vertical lines for the thresholds
 
@@ -36,12 +175,13 @@ def plot_histogram_with_thresholds(series, user_threshold):
 
 
 
-def plot_kaplan_meier(survival_function):
+def plot_kaplan_meier(survival_function, max_points=MAX_CURVE_POINTS):
     """
     Plot the Kaplan-Meier survival curve.
 
     Parameters:
         survival_function (pd.DataFrame): Survival probabilities over time.
+        max_points (int, optional): Points kept by downsample_curve, None for no LTTB.
 
     Returns:
         plotly.graph_objects.Figure: The Kaplan-Meier plot.
@@ -50,10 +190,11 @@ def plot_kaplan_meier(survival_function):
         raise ValueError("The survival function is empty. Cannot plot Kaplan-Meier curve.")
     #print(survival_function)
 
+    x, y = downsample_curve(survival_function.index, survival_function['KM_estimate'], max_points)
     fig = go.Figure()
     fig.add_trace(go.Scatter(
-        x=survival_function.index,
-        y=survival_function['KM_estimate'],
+        x=x,
+        y=y,
         mode='lines',
         name='Survival Probability'
     ))
@@ -65,20 +206,22 @@ def plot_kaplan_meier(survival_function):
     )
     return fig
 
-def plot_hazard_function(cumulative_hazard):
+def plot_hazard_function(cumulative_hazard, max_points=MAX_CURVE_POINTS):
     """
     Plot the Nelson-Aalen cumulative hazard curve.
 
     Parameters:
         cumulative_hazard (pd.Series): Cumulative hazard values over time.
+        max_points (int, optional): Points kept by downsample_curve, None for no LTTB.
 
     Returns:
         plotly.graph_objects.Figure: The Nelson-Aalen cumulative hazard plot.
     """
+    x, y = downsample_curve(cumulative_hazard.index, cumulative_hazard.to_numpy().ravel(), max_points)
     fig = go.Figure()
     fig.add_trace(go.Scatter(
-        x=cumulative_hazard.index,
-        y=cumulative_hazard.values,
+        x=x,
+        y=y,
         mode='lines',
         name='Cumulative Hazard'
     ))
@@ -90,20 +233,22 @@ def plot_hazard_function(cumulative_hazard):
     )
     return fig
 
-def plot_shrinking_risk(shrinking_risk):
+def plot_shrinking_risk(shrinking_risk, max_points=MAX_CURVE_POINTS):
     """
     Plot the shrinking risk over time.
 
     Parameters:
         shrinking_risk (pd.Series): Shrinking risk values over time.
+        max_points (int, optional): Points kept by downsample_curve, None for no LTTB.
 
     Returns:
         plotly.graph_objects.Figure: The shrinking risk plot.
     """
+    x, y = downsample_curve(shrinking_risk.index, shrinking_risk.to_numpy().ravel(), max_points)
     fig = go.Figure()
     fig.add_trace(go.Scatter(
-        x=shrinking_risk.index,
-        y=shrinking_risk.values,
+        x=x,
+        y=y,
         mode='lines',
         name='Shrinking Risk',
         line=dict(color='red')
@@ -118,23 +263,25 @@ def plot_shrinking_risk(shrinking_risk):
 
 
 
-def plot_mapped_survival(mapped_survival, threshold):
+def plot_mapped_survival(mapped_survival, threshold, max_points=MAX_CURVE_POINTS):
     """
     Plot the mapped survival curve with a vertical threshold line.
 
     Parameters:
         mapped_survival (pd.DataFrame): Adjusted survival probabilities in the new range.
         threshold (float): The threshold value to represent the median of trip duration.
+        max_points (int, optional): Points kept by downsample_curve, None for no LTTB.
 
     Returns:
         plotly.graph_objects.Figure: Plot of the mapped survival curve.
     """
+    x, y = downsample_curve(mapped_survival.index, mapped_survival['KM_estimate'], max_points)
     fig = go.Figure()
     
     # Add the survival curve
     fig.add_trace(go.Scatter(
-        x=mapped_survival.index,
-        y=mapped_survival['KM_estimate'],
+        x=x,
+        y=y,
         mode='lines',
         name='Mapped Survival Function',
         line=dict(color='blue')
@@ -159,7 +306,7 @@ def plot_mapped_survival(mapped_survival, threshold):
     
     return fig
 
-def plot_available_containers(df, threshold):
+def plot_available_containers(df, threshold, max_points=MAX_CURVE_POINTS):
     """
     Plot the remaining number of containers over time with a user-defined vertical threshold.
 
@@ -168,15 +315,17 @@ def plot_available_containers(df, threshold):
             - 'Duration': Duration of each trip (time).
             - 'Containers': Number of containers at each time point.
         threshold (float): User-defined time threshold for the vertical line.
+        max_points (int, optional): Points kept by downsample_curve, None for no LTTB.
     
     Returns:
         plotly.graph_objects.Figure: Plot of remaining containers over time.
     """
     # Plot the remaining containers
+    x, y = downsample_curve(df.index, df['Containers'], max_points)
     fig = go.Figure()
     fig.add_trace(go.Scatter(
-        x=df.index,
-        y=df['Containers'],
+        x=x,
+        y=y,
         mode='lines',
         name='Remaining Containers'
     ))
@@ -1,5 +1,6 @@
 from scipy.stats import expon
 from scipy.stats import lognorm
+from scipy import fft
 import numpy as np
 import pandas as pd
 
@@ -56,6 +57,51 @@ def get_lognorm_PDF(df, duration, scaling_factor = 1):
     return closest_row["PDF"] * scaling_factor
     
 
+class HazardTable:
+    """
+    Precomputed lookup of the recollecting PDF by trip day, built once from the
+    DataFrame returned by get_lognorm_distribution.
+
+    It keeps the behavior of get_lognorm_PDF (the PDF of the closest duration is returned)
+    but the closest duration of every integer day is resolved when the table is built,
+    so each lookup is a single array index. Days after the last duration of the
+    distribution use the last value.
+    """
+
+    def __init__(self, df):
+        """
+        Parameters:
+            df (pd.DataFrame): DataFrame containing "Duration" and "PDF" columns.
+        """
+        if "Duration" not in df.columns or "PDF" not in df.columns:
+            raise ValueError("The DataFrame must contain 'Duration' and 'PDF' columns.")
+
+        durations = df["Duration"].to_numpy(dtype=float)
+        pdf_values = df["PDF"].to_numpy(dtype=float)
+
+        # closest duration for each integer day, argmin keeps the first match as idxmin does
+        days = np.arange(int(np.ceil(durations.max())) + 1)
+        closest = np.abs(durations[np.newaxis, :] - days[:, np.newaxis]).argmin(axis=1)
+        self.values = pdf_values[closest]
+
+    def get_pdf(self, day_trip, scaling_factor = 1):
+        """
+        Returns the PDF value for a day or an array of days, non integer days are rounded to the nearest day.
+
+        Parameters:
+            day_trip (int, float or np.ndarray): Day(s) of the trip.
+            scaling_factor (float): Factor applied to the PDF value.
+
+        Returns:
+            float or np.ndarray: The PDF value(s) for the given day(s).
+        """
+        day_trip = np.asarray(day_trip)
+        if day_trip.dtype.kind != "i":
+            day_trip = np.rint(day_trip).astype(np.intp)
+        index = np.clip(day_trip, 0, len(self.values) - 1)
+        return self.values[index] * scaling_factor
+
+
 #dist = get_lognorm_distribution()
 #res = get_lognorm_PDF(dist,0)
 #print (res)
@@ -124,31 +170,149 @@ def calculate_adjusted_params(perc_trips_observed, mu, sigma):
 
     return adjusted_mu, adjusted_sigma
 
-import pandas as pd
-
 def calculate_available_containers(initial_containers, days, probability):
     """
     Calculate the available containers over a number of days based on the given probability.
 
+    The day by day recurrence N(t) = N(t-1) - N(t-1) * probability is a geometric decay, so it is
+    computed in closed form as N(t) = initial_containers * (1 - probability)^t.
+    Arrays of initial containers and/or probabilities are broadcast against each other and
+    projected all at once, one row per scenario.
+
     Parameters:
-    initial_containers (int): The initial number of containers.
+    initial_containers (int or array-like): The initial number of containers.
     days (int): The number of days to calculate for.
-    probability (float): The fixed risk factor (0 ≤ probability ≤ 1).
+    probability (float or array-like): The fixed risk factor (0 ≤ probability ≤ 1).
+
+    Returns:
+    pd.DataFrame: With scalar inputs, a DataFrame with day-by-day calculations of available containers
+                  ('Day' and 'Containers' columns).
+    np.ndarray: With array inputs, the available containers of each scenario (row) at each day (column),
+                of shape (scenarios, days).
+    """
+    grid = project_available_containers(initial_containers, days, probability)
+    if np.ndim(initial_containers) or np.ndim(probability):
+        return grid.reshape(-1, days)
+    return pd.DataFrame({'Day': np.arange(1, days + 1), 'Containers': grid})
+
+
+def project_available_containers(initial_containers, days, probability):
+    """
+    Closed form of the available containers after each day, N0 * (1 - p)^t for t = 1..days.
+
+    Parameters:
+        initial_containers (int or array-like): The initial number(s) of containers.
+        days (int): The number of days to project.
+        probability (float or array-like): The daily risk factor(s).
+
+    Returns:
+        np.ndarray: Projections with the broadcast shape of the inputs plus a last axis of days.
+    """
+    initial = np.asarray(initial_containers, dtype=float)[..., np.newaxis]
+    # a risk above 1 empties the stock on the first day (it can not become negative)
+    survival = np.clip(1 - np.asarray(probability, dtype=float), 0, None)[..., np.newaxis]
+    return initial * np.power(survival, np.arange(1, days + 1))
+
+
+def fft_convolve(signal, kernel, n):
+    """
+    First n terms of the linear convolution of two sequences, computed with real FFTs.
+
+    Parameters:
+        signal (np.ndarray): Sequence(s) to convolve, along the last axis.
+        kernel (np.ndarray): Kernel of the convolution.
+        n (int): Number of terms to return.
 
     Returns:
-    pd.DataFrame: A DataFrame with day-by-day calculations of available containers.
+        np.ndarray: The convolution truncated to n terms.
     """
-    # Create a DataFrame to store results
-    df = pd.DataFrame({'Day': range(1, days + 1)})
-    df['Containers'] = 0  # Initialize the column for available containers
+    size = fft.next_fast_len(signal.shape[-1] + kernel.shape[-1] - 1, real=True)
+    result = fft.irfft(fft.rfft(signal, size) * fft.rfft(kernel, size), size)
+    return result[..., :n]
+
 
-    # Set the initial number of containers
-    current_containers = initial_containers
+def inverse_power_series(series, n):
+    """
+    First n terms of the inverse of a power series with a constant term of 1, i.e. the sequence g
+    with (series * g)[t] = 1 if t == 0 else 0, by Newton iteration (g = g * (2 - series * g)),
+    doubling the number of exact terms with two FFT convolutions per iteration.
 
-    # Calculate N_available for each day
-    for i in range(days):
-        current_containers -= current_containers * probability
-        current_containers = max(0, current_containers)  # Prevent negative values
-        df.iloc[i, df.columns.get_loc('Containers')] = current_containers
+    Parameters:
+        series (np.ndarray): Coefficients of the series, series[0] must be 1.
+        n (int): Number of terms to return.
 
-    return df
\ No newline at end of file
+    Returns:
+        np.ndarray: The first n coefficients of the inverse.
+    """
+    inverse = np.ones(1)
+    terms = 1
+    while terms < n:
+        terms = min(2 * terms, n)
+        correction = -fft_convolve(series[:terms], inverse, terms)
+        correction[0] += 2
+        inverse = fft_convolve(inverse, correction, terms)
+    return inverse[:n]
+
+
+def project_trip_flows(initial_containers, days, returned_pmf_by_day, lost_pmf_by_day, start_rate=None, starts=None):
+    """
+    Time-varying projection of the fleet: the trip starts of each day are convolved with the
+    probabilities of a trip returning or being lost after each of its days.
+
+    A trip started on day t with a duration of d days is in trip from day t to day t + d - 1 and
+    ends (returned or lost) on day t + d. The starts are either given, or each idle container starts
+    a trip with probability start_rate every day: the starts then solve the renewal equation
+    starts = start_rate * (initial_containers - in trip - lost), whose convolution is inverted
+    as a power series with FFTs.
+
+    Parameters:
+        initial_containers (float): The initial number of containers, all idle at day 1.
+        days (int): The number of days to project.
+        returned_pmf_by_day (np.ndarray): Probability that a trip returns after d days, indexed by d.
+        lost_pmf_by_day (np.ndarray): Probability that a trip is lost after d days, indexed by d.
+        start_rate (float, optional): Daily probability of an idle container starting a trip.
+        starts (np.ndarray, optional): Expected trip starts of each day, used instead of start_rate.
+
+    Returns:
+        pd.DataFrame: Expected counts of each day with the columns 'Day', 'Starts', 'InTrip',
+                      'Returned' (returned that day), 'Lost' (lost until that day), 'Idle'
+                      and 'Containers' (not lost).
+    """
+    if (start_rate is None) == (starts is None):
+        raise ValueError("Exactly one of start_rate and starts must be given.")
+
+    # no trip ends after the durations given (or on its first day)
+    returned_pmf, lost_pmf = np.zeros(days + 1), np.zeros(days + 1)
+    for padded, pmf in ((returned_pmf, returned_pmf_by_day), (lost_pmf, lost_pmf_by_day)):
+        pmf = np.asarray(pmf, dtype=float)[1:days + 1]
+        padded[1:len(pmf) + 1] = pmf
+
+    in_trip_kernel = 1 - np.cumsum(returned_pmf + lost_pmf)
+    lost_kernel = np.cumsum(lost_pmf)
+
+    if starts is None:
+        # containers out of the idle pool because of the trips started on previous days
+        busy_kernel = in_trip_kernel + lost_kernel
+        busy_kernel[0] = 0
+        series = start_rate * busy_kernel
+        series[0] = 1
+        starts = start_rate * initial_containers * np.cumsum(inverse_power_series(series, days))
+    else:
+        starts = np.asarray(starts, dtype=float)[:days]
+        if len(starts) != days:
+            raise ValueError("starts must have one value per day.")
+
+    # the FFT leaves rounding errors around 0
+    in_trip = np.clip(fft_convolve(starts, in_trip_kernel, days), 0, None)
+    returned = np.clip(fft_convolve(starts, returned_pmf, days), 0, None)
+    lost = np.cumsum(np.clip(fft_convolve(starts, lost_pmf, days), 0, None))
+
+    return pd.DataFrame({
+        'Day': np.arange(1, days + 1),
+        'Starts': starts,
+        'InTrip': in_trip,
+        'Returned': returned,
+        'Lost': lost,
+        'Idle': initial_containers - in_trip - lost,
+        'Containers': initial_containers - lost,
+    })
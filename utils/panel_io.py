@@ -0,0 +1,80 @@
+import os
+import glob
+import pandas as pd
+
+
+PANEL_FOLDER = "panel"
+TOTAL_STOCK_FILE = "total_stock.parquet"
+
+
+def write_panel_dataset(chunks, path):
+    """
+    Writes the chunks of a simulated panel to a Parquet dataset, one part file per chunk.
+    Only one chunk is held in memory at a time.
+
+    Parameters:
+        chunks (iterable of pd.DataFrame): Chunks of the panel, e.g. DataSimulator.iter_container_data().
+        path (str): Folder of the dataset, the part files are written in its "panel" subfolder.
+
+    Returns:
+        int: Number of part files written.
+    """
+    panel_path = os.path.join(path, PANEL_FOLDER)
+    os.makedirs(panel_path, exist_ok=True)
+
+    # remove the parts of a previous dataset written in the same folder
+    for old_part in glob.glob(os.path.join(panel_path, "part-*.parquet")):
+        os.remove(old_part)
+
+    n_parts = 0
+    for chunk in chunks:
+        chunk.to_parquet(os.path.join(panel_path, f"part-{n_parts:05d}.parquet"), index=False)
+        n_parts += 1
+    return n_parts
+
+
+def write_total_stock(daily_stock, path):
+    """
+    Writes the daily total stock of a panel dataset.
+
+    Parameters:
+        daily_stock (pd.Series): Total stock indexed by ActualDate.
+        path (str): Folder of the dataset.
+    """
+    daily_stock.rename("TotalStock").rename_axis("ActualDate").reset_index().to_parquet(
+        os.path.join(path, TOTAL_STOCK_FILE), index=False
+    )
+
+
+def read_total_stock(path):
+    """
+    Reads the daily total stock of a panel dataset.
+
+    Parameters:
+        path (str): Folder of the dataset.
+
+    Returns:
+        pd.Series: Total stock indexed by ActualDate.
+    """
+    return pd.read_parquet(os.path.join(path, TOTAL_STOCK_FILE)).set_index("ActualDate")["TotalStock"]
+
+
+def iter_panel_dataset(path, columns=None, with_total_stock=False):
+    """
+    Reads a panel dataset back one part file at a time.
+
+    Parameters:
+        path (str): Folder of the dataset.
+        columns (list, optional): Columns to read, all by default.
+        with_total_stock (bool): Adds the TotalStock column to each chunk.
+
+    Yields:
+        pd.DataFrame: Chunks of the panel in order of container ID.
+    """
+    total_stock = read_total_stock(path) if with_total_stock else None
+
+    for part in sorted(glob.glob(os.path.join(path, PANEL_FOLDER, "part-*.parquet"))):
+        chunk = pd.read_parquet(part, columns=columns)
+        if total_stock is not None:
+            chunk["TotalStock"] = chunk["ActualDate"].map(total_stock).astype("int64")
+        yield chunk
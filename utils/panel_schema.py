@@ -0,0 +1,247 @@
+"""
+Compact dtypes of the simulated panel.
+
+The public panel of DataSimulator.simulate_container_data uses int64 IDs and flags, float64 trip
+columns (because of their missing values) and datetime64[ns] dates, 72 bytes per row. The compact
+layout stores the same data in about 4x less memory:
+    - ContainerID and TotalStock: smallest unsigned integer holding their values (uint16 up to 65,535 containers).
+    - ActualDate: uint16 day offset from the start date.
+    - StartingDate and RecollectingDate: nullable uint16 day offsets (pyarrow backed, 1 bit per missing flag).
+    - DayTrip and TripID: nullable uint16.
+    - IsLost and IsFakeLost: bool.
+
+to_compact and from_compact convert between both layouts, offsets_to_dates turns offsets back to dates.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+DATE_COLUMNS = ["ActualDate", "StartingDate", "RecollectingDate"]
+NULLABLE_COLUMNS = ["StartingDate", "RecollectingDate", "DayTrip", "TripID"]
+FLAG_COLUMNS = ["IsLost", "IsFakeLost"]
+# smallest unsigned integer type holding the values
+SIZED_COLUMNS = ["ContainerID", "TotalStock"]
+
+# rows converted at once by date_offsets
+CHUNK_ROWS = 1 << 20
+NANOSECONDS_PER_DAY = 24 * 60 * 60 * 10 ** 9
+
+# dtypes of the public panel, restored by from_compact
+PANEL_DTYPES = {
+    "ContainerID": "int64",
+    "ActualDate": "datetime64[ns]",
+    "StartingDate": "datetime64[ns]",
+    "RecollectingDate": "datetime64[ns]",
+    "IsLost": "int64",
+    "DayTrip": "float64",
+    "TripID": "float64",
+    "IsFakeLost": "int64",
+    "TotalStock": "int64",
+}
+
+
+def nullable_uint16():
+    """
+    Nullable uint16 dtype of the compact panel.
+    """
+    return pd.ArrowDtype(pa.uint16())
+
+
+def to_nullable_uint16(values, missing):
+    """
+    Builds a nullable uint16 column from integer values and their missing mask, without going
+    through Python objects.
+
+    Returns:
+        pd.arrays.ArrowExtensionArray: The column, missing where the mask is True.
+    """
+    values = values.astype(np.uint16, copy=False)
+    null_count = int(np.count_nonzero(missing))
+    # arrow validity bitmap: one bit per row, set for the valid values
+    validity = pa.py_buffer(np.packbits(~missing, bitorder="little")) if null_count else None
+    array = pa.Array.from_buffers(pa.uint16(), len(values), [validity, pa.py_buffer(values)], null_count=null_count)
+    return pd.arrays.ArrowExtensionArray(array)
+
+
+def smallest_unsigned_dtype(max_value):
+    """
+    Returns the smallest NumPy unsigned integer dtype holding values up to max_value.
+    """
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    raise ValueError(f"{max_value} does not fit in an unsigned integer.")
+
+
+def date_offsets(dates, start_date, column="dates"):
+    """
+    Converts dates to uint16 day offsets from start_date, NaT becomes a missing value.
+    The offsets are computed by blocks of CHUNK_ROWS rows, so the int64 temporaries stay small.
+
+    Returns:
+        tuple: Offsets (np.ndarray of uint16, 0 where missing) and mask of the missing dates.
+    """
+    dates = np.asarray(dates)
+    if dates.dtype != "datetime64[ns]":
+        dates = pd.to_datetime(dates).to_numpy().astype("datetime64[ns]", copy=False)
+    missing = np.isnat(dates)
+    nanoseconds = dates.view(np.int64)
+    start = np.datetime64(start_date, "ns").astype(np.int64)
+
+    offsets = np.empty(len(dates), dtype=np.uint16)
+    for first in range(0, len(dates), CHUNK_ROWS):
+        block = slice(first, first + CHUNK_ROWS)
+        days = (nanoseconds[block] - start) // NANOSECONDS_PER_DAY
+        days[missing[block]] = 0
+        check_range(column, days)
+        offsets[block] = days
+    return offsets, missing
+
+
+def offsets_to_dates(offsets, start_date):
+    """
+    Converts day offsets from start_date (e.g. a column of the compact panel) back to dates.
+
+    Parameters:
+        offsets (pd.Series or array-like): Day offsets, possibly with missing values.
+        start_date (str): Date of the offset 0, in "%Y-%m-%d" format.
+
+    Returns:
+        pd.Series: datetime64[ns] dates, NaT for the missing offsets.
+    """
+    index = offsets.index if isinstance(offsets, pd.Series) else None
+    values = pd.Series(offsets).to_numpy(dtype=float, na_value=np.nan)
+    missing = np.isnan(values)
+    days = np.where(missing, 0, values).astype(np.int64)
+    dates = (np.datetime64(start_date, "D") + days).astype("datetime64[ns]")
+    dates[missing] = np.datetime64("NaT")
+    return pd.Series(dates, index=index)
+
+
+def to_compact(df, start_date):
+    """
+    Converts the panel to the compact dtypes. The start date is kept in the attrs of the result.
+
+    Parameters:
+        df (pd.DataFrame): Panel of simulated container data.
+        start_date (str): Start date of the simulation, in "%Y-%m-%d" format.
+
+    Returns:
+        pd.DataFrame: The panel with compact dtypes.
+    """
+    compact = {}
+    for column in df.columns:
+        values = df[column]
+        if column in DATE_COLUMNS:
+            offsets, missing = date_offsets(values, start_date, column)
+            compact[column] = to_nullable_uint16(offsets, missing) if column in NULLABLE_COLUMNS else offsets
+        elif column in NULLABLE_COLUMNS:
+            numbers = values.to_numpy(dtype=float, na_value=np.nan)
+            missing = np.isnan(numbers)
+            # fmin and fmax skip the missing values without copying the column
+            check_range(column, np.array([np.fmin.reduce(numbers), np.fmax.reduce(numbers)]) if len(numbers) else numbers)
+            with np.errstate(invalid="ignore"):
+                # the missing values are cast to anything, they are masked
+                compact[column] = to_nullable_uint16(numbers, missing)
+        elif column in FLAG_COLUMNS:
+            compact[column] = values.to_numpy() != 0
+        elif column in SIZED_COLUMNS:
+            compact[column] = values.to_numpy().astype(smallest_unsigned_dtype(values.max() if len(values) else 0))
+        else:
+            compact[column] = values
+
+    result = pd.DataFrame(compact, index=df.index, copy=False)
+    result.attrs["start_date"] = start_date
+    return result
+
+
+def from_compact(compact, start_date=None):
+    """
+    Converts a compact panel back to the dtypes of the public panel.
+
+    Parameters:
+        compact (pd.DataFrame): Panel returned by to_compact.
+        start_date (str, optional): Start date of the simulation, read from the attrs by default.
+
+    Returns:
+        pd.DataFrame: The panel with the dtypes of simulate_container_data.
+    """
+    start_date = start_date or compact.attrs.get("start_date")
+    if start_date is None:
+        raise ValueError("The start date is needed to convert the day offsets to dates.")
+
+    columns = {}
+    for column in compact.columns:
+        values = compact[column]
+        if column in DATE_COLUMNS:
+            columns[column] = offsets_to_dates(values, start_date)
+        elif column in PANEL_DTYPES:
+            columns[column] = values.to_numpy(dtype=PANEL_DTYPES[column], na_value=np.nan) if column in NULLABLE_COLUMNS \
+                else values.to_numpy().astype(PANEL_DTYPES[column])
+        else:
+            columns[column] = values
+    return pd.DataFrame(columns, index=compact.index)
+
+
+def check_range(column, values):
+    """
+    Checks that the values of a column fit in a uint16.
+    """
+    if len(values) and (np.nanmin(values) < 0 or np.nanmax(values) > np.iinfo(np.uint16).max):
+        raise ValueError(f"Column '{column}' has values out of the uint16 range of the compact panel.")
+
+
+def validate_compact(compact):
+    """
+    Checks that a panel uses the compact dtypes.
+
+    Raises:
+        ValueError: With the columns whose dtype is not the compact one.
+    """
+    uint16 = nullable_uint16()
+    errors = []
+    for column in compact.columns:
+        dtype = compact[column].dtype
+        if column in NULLABLE_COLUMNS:
+            valid = dtype == uint16
+        elif column in DATE_COLUMNS:
+            valid = dtype == np.uint16
+        elif column in FLAG_COLUMNS:
+            valid = dtype == bool
+        elif column in SIZED_COLUMNS:
+            valid = dtype.kind == "u"
+        else:
+            continue
+        if not valid:
+            errors.append(f"{column} ({dtype})")
+    if errors:
+        raise ValueError(f"Columns without the compact dtype: {', '.join(errors)}.")
+
+
+def memory_report(df, compact=None, start_date=None):
+    """
+    Memory of each column of the panel with its public and compact dtypes.
+
+    Parameters:
+        df (pd.DataFrame): Panel of simulated container data.
+        compact (pd.DataFrame, optional): The compact panel, computed with to_compact when not given.
+        start_date (str, optional): Start date of the simulation, needed when compact is not given.
+
+    Returns:
+        pd.DataFrame: 'original_bytes', 'compact_bytes', 'saved_bytes' and 'reduction' (original / compact)
+                      of each column and of the whole panel ('Total' row).
+    """
+    if compact is None:
+        if start_date is None:
+            raise ValueError("start_date is needed to build the compact panel.")
+        compact = to_compact(df, start_date)
+
+    report = pd.DataFrame({
+        "original_bytes": df.memory_usage(deep=True, index=False),
+        "compact_bytes": compact.memory_usage(deep=True, index=False),
+    })
+    report.loc["Total"] = report.sum()
+    report["saved_bytes"] = report["original_bytes"] - report["compact_bytes"]
+    report["reduction"] = report["original_bytes"] / report["compact_bytes"]
+    return report
@@ -0,0 +1,154 @@
+import os
+import io
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import cached_property
+
+import pandas as pd
+
+
+def make_cache_key(**params):
+    """
+    Builds a content-addressed key from the parameters of a simulation.
+
+    Parameters:
+        **params: Parameters that fully determine the simulated data
+                  (num_containers, days, min_trip_days, scenario, perc_trips_observed, seed, engine)
+                  and the version of the simulator that produced the data.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest of the parameters.
+    """
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SimulationResult:
+    """
+    Output of a simulation: the simulated panel and its evaluation metrics.
+    The download bytes are only computed the first time they are requested.
+    """
+
+    def __init__(self, df, eval_metrics):
+        """
+        Parameters:
+            df (pd.DataFrame): Simulated container data.
+            eval_metrics (dict): Evaluation metrics of the simulator.
+        """
+        self.df = df
+        self.eval_metrics = eval_metrics
+
+    @cached_property
+    def csv_bytes(self):
+        """
+        The panel encoded as CSV.
+        """
+        return self.df.to_csv(index=False).encode("utf-8")
+
+    @cached_property
+    def parquet_bytes(self):
+        """
+        The panel encoded as Parquet.
+        """
+        buffer = io.BytesIO()
+        self.df.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+
+
+class ResultCache:
+    """
+    Two tier cache of simulation results: an in-memory LRU of the most recent results and a
+    Parquet folder on disk, evicted by total size (least recently used files first).
+    """
+
+    def __init__(self, path, max_items=8, max_disk_bytes=1024 ** 3):
+        """
+        Parameters:
+            path (str): Folder of the disk tier.
+            max_items (int): Number of results kept in memory.
+            max_disk_bytes (int): Maximum total size of the disk tier in bytes.
+        """
+        self.path = path
+        self.max_items = max_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        # Streamlit runs every session in its own thread
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _files(self, key):
+        return os.path.join(self.path, f"{key}.parquet"), os.path.join(self.path, f"{key}.json")
+
+    def get(self, key):
+        """
+        Returns the cached result of a key, None if it is not cached.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+            data_file, metrics_file = self._files(key)
+            if not (os.path.exists(data_file) and os.path.exists(metrics_file)):
+                return None
+
+            with open(metrics_file) as file:
+                result = SimulationResult(pd.read_parquet(data_file), json.load(file))
+            # mark the files as recently used for the eviction
+            os.utime(data_file)
+            self._remember(key, result)
+            return result
+
+    def put(self, key, result):
+        """
+        Stores a result in both tiers.
+        """
+        with self._lock:
+            self._remember(key, result)
+
+            data_file, metrics_file = self._files(key)
+            result.df.to_parquet(data_file, index=False)
+            with open(metrics_file, "w") as file:
+                json.dump(result.eval_metrics, file)
+            self._evict_disk()
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached result of a key, computing and storing it if needed.
+
+        Parameters:
+            key (str): Key of the result, see make_cache_key.
+            compute (callable): Function without arguments returning a SimulationResult.
+
+        Returns:
+            SimulationResult: The result of the key.
+        """
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        data_files = [
+            os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith(".parquet")
+        ]
+        data_files.sort(key=os.path.getmtime)
+        total_size = sum(os.path.getsize(name) for name in data_files)
+
+        # keep at least the most recent result
+        while total_size > self.max_disk_bytes and len(data_files) > 1:
+            oldest = data_files.pop(0)
+            total_size -= os.path.getsize(oldest)
+            os.remove(oldest)
+            metrics_file = oldest[:-len(".parquet")] + ".json"
+            if os.path.exists(metrics_file):
+                os.remove(metrics_file)
@@ -0,0 +1,84 @@
+import numpy as np
+
+
+class RunningStats:
+    """
+    Count, mean, variance and exact median of integer values (e.g. trip durations in days)
+    updated batch by batch, so the statistics of a chunked input match the ones of the whole input.
+
+    The mean and the variance are merged with the parallel form of Welford's algorithm (Chan et al.),
+    the median comes from a histogram of the values, which is exact for integers.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        # sum of the squared differences from the mean
+        self.m2 = 0.0
+        self.histogram = np.zeros(0, dtype=np.int64)
+
+    def update(self, values):
+        """
+        Adds a batch of values, the missing ones are ignored.
+
+        Parameters:
+            values (array-like): Non negative integer values (integers or floats).
+
+        Returns:
+            RunningStats: self, to chain the updates.
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+
+        integers = values.astype(np.int64)
+        if np.any(integers != values) or integers.min() < 0:
+            raise ValueError("RunningStats only supports non negative integer values.")
+
+        batch = RunningStats()
+        batch.count = len(values)
+        batch.mean = values.mean()
+        batch.m2 = ((values - batch.mean) ** 2).sum()
+        batch.histogram = np.bincount(integers)
+        return self.merge(batch)
+
+    def merge(self, other):
+        """
+        Adds the values of another RunningStats.
+
+        Returns:
+            RunningStats: self.
+        """
+        if other.count == 0:
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+
+        size = max(len(self.histogram), len(other.histogram))
+        self.histogram = np.pad(self.histogram, (0, size - len(self.histogram)))
+        self.histogram[:len(other.histogram)] += other.histogram
+        return self
+
+    @property
+    def variance(self):
+        """
+        Sample variance (ddof=1, as pandas), NaN with less than 2 values.
+        """
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def median(self):
+        """
+        Exact median, the mean of the two middle values for an even count (as pandas), NaN without values.
+        """
+        if self.count == 0:
+            return np.nan
+        cumulative = np.cumsum(self.histogram)
+        lower = np.searchsorted(cumulative, (self.count - 1) // 2, side="right")
+        upper = np.searchsorted(cumulative, self.count // 2, side="right")
+        return (lower + upper) / 2
@@ -0,0 +1,128 @@
+"""
+Batch runner of scenario grids: simulates the containers, labels the trips and fits the
+Kaplan-Meier model for every combination of parameters, instead of going through the pages.
+
+Usage:
+    python -m utils.sweep --min-trip-days 10 20 30 --perc-trips-observed 0.5 1 --scenario 2 --output sweep.csv
+"""
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from components.DataSimulator import DataSimulator, label_trips
+from components.Modeler import Modeler
+
+
+# Parameters that change the simulated trips, min_trip_days only changes their labels
+SIMULATION_PARAMS = ["scenario", "perc_trips_observed", "num_containers", "days", "seed"]
+
+
+def make_grid(min_trip_days, perc_trips_observed=(1,), num_containers=(1000,), days=(365,), seed=(42,), scenario=(1,)):
+    """
+    Builds every combination of the given parameter values.
+
+    Parameters:
+        min_trip_days, perc_trips_observed, num_containers, days, seed, scenario (iterable): Values of each parameter.
+
+    Returns:
+        pd.DataFrame: One row per grid point.
+    """
+    values = {
+        "scenario": scenario,
+        "perc_trips_observed": perc_trips_observed,
+        "num_containers": num_containers,
+        "days": days,
+        "seed": seed,
+        "min_trip_days": min_trip_days,
+    }
+    return pd.DataFrame(list(itertools.product(*values.values())), columns=list(values))
+
+
+def run_sweep(grid, n_workers=None):
+    """
+    Evaluates every point of a grid. The points sharing the simulation parameters are evaluated
+    by the same task from a single simulation, only the labelling and the fit are repeated for
+    each min_trip_days.
+
+    Parameters:
+        grid (pd.DataFrame): Grid of make_grid, the missing simulation parameters take the
+                             defaults of DataSimulator.
+        n_workers (int, optional): When greater than 1, the simulations run in a pool of processes.
+
+    Returns:
+        pd.DataFrame: The grid with the 'precision_treshold', 'F1_Score_threshold' (see
+                      DataSimulator.eval_metrics), 'median_trip_time' and 'shrinking_rate' columns.
+    """
+    defaults = {"scenario": 1, "perc_trips_observed": 1, "seed": 42}
+    grid = grid.assign(**{name: value for name, value in defaults.items() if name not in grid.columns})
+
+    tasks = [
+        (dict(zip(SIMULATION_PARAMS, params)), sorted(group["min_trip_days"].unique()))
+        for params, group in grid.groupby(SIMULATION_PARAMS, sort=False)
+    ]
+
+    if n_workers is None or n_workers <= 1:
+        results = [evaluate_simulation(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(evaluate_simulation, tasks))
+
+    metrics = pd.DataFrame([row for rows in results for row in rows])
+    return grid.merge(metrics, on=SIMULATION_PARAMS + ["min_trip_days"], how="left")
+
+
+def evaluate_simulation(task):
+    """
+    Simulates the trips of one set of simulation parameters and evaluates each min_trip_days.
+
+    Parameters:
+        task (tuple): Simulation parameters (dict) and list of min_trip_days.
+
+    Returns:
+        list: One dict of parameters and metrics per min_trip_days.
+    """
+    params, thresholds = task
+    simulator = DataSimulator(min_trip_days=thresholds[0], **params)
+    trips = simulator.simulate_raw_trips()
+    curve = simulator.threshold_curve(thresholds)
+
+    rows = []
+    for min_trip_days, precision, f1_score in zip(thresholds, curve["precision_treshold"], curve["F1_Score_threshold"]):
+        # the probability of being in a trip does not change the shrinking rate
+        modeler = Modeler.from_trip_table(label_trips(trips, min_trip_days), prob_in_trip=1)
+        rows.append({
+            **params,
+            "min_trip_days": min_trip_days,
+            "precision_treshold": precision,
+            "F1_Score_threshold": f1_score,
+            "median_trip_time": modeler.median_trip_time,
+            "shrinking_rate": modeler.shrinking_rate_at_median(),
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a grid of container simulations and Kaplan-Meier fits.")
+    parser.add_argument("--min-trip-days", type=int, nargs="+", required=True)
+    parser.add_argument("--perc-trips-observed", type=float, nargs="+", default=[1])
+    parser.add_argument("--num-containers", type=int, nargs="+", default=[1000])
+    parser.add_argument("--days", type=int, nargs="+", default=[365])
+    parser.add_argument("--seed", type=int, nargs="+", default=[42])
+    parser.add_argument("--scenario", type=int, nargs="+", default=[1])
+    parser.add_argument("--n-workers", type=int, default=None)
+    parser.add_argument("--output", help="CSV file of the results, printed when omitted.")
+    args = parser.parse_args(argv)
+
+    grid = make_grid(args.min_trip_days, args.perc_trips_observed, args.num_containers, args.days, args.seed, args.scenario)
+    results = run_sweep(grid, n_workers=args.n_workers)
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+    else:
+        print(results.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+
+def pack_trip_key(container_id, trip_id):
+    """
+    Packs the container and the trip number in a single int64 key (container << 32 | trip),
+    which identifies a trip without building strings and keeps the order of (container, trip).
+
+    Parameters:
+        container_id (array-like): Container IDs.
+        trip_id (array-like): Trip numbers of each container (integers, possibly stored as floats).
+
+    Returns:
+        np.ndarray: int64 trip keys.
+    """
+    container_id = np.asarray(container_id).astype(np.int64)
+    trip_id = np.asarray(trip_id).astype(np.int64)
+    return (container_id << 32) | trip_id
+
+
+def unpack_trip_key(trip_key):
+    """
+    Inverse of pack_trip_key.
+
+    Returns:
+        tuple: Container IDs and trip numbers (np.ndarray of int64).
+    """
+    trip_key = np.asarray(trip_key, dtype=np.int64)
+    return trip_key >> 32, trip_key & 0xFFFFFFFF
+
+
+def format_trip_key(trip_key):
+    """
+    Renders trip keys as "<ContainerID>_<TripID>" strings, only meant for display.
+
+    Returns:
+        pd.Series: The trip keys as strings.
+    """
+    container_id, trip_id = unpack_trip_key(trip_key)
+    return pd.Series(container_id).astype(str) + "_" + pd.Series(trip_id).astype(str)
+
+
+def display_trip_table(trips):
+    """
+    Copy of a trip table with the TripKey column replaced by the readable UniqueTripID, for the Streamlit tables.
+    """
+    display = trips.drop(columns="TripKey")
+    display.insert(0, "UniqueTripID", format_trip_key(trips["TripKey"]).to_numpy())
+    return display
+
+
+class TripAggregate:
+    """
+    One row per trip of a daily panel (or chunk of panel), with the counts of rows needed by the KPIs.
+    Built once per panel by DataTransformer.get_trip_aggregate and passed to the Modeler of the
+    same panel (see Modeler.trips_from_aggregate), so the panel is only aggregated once.
+    """
+
+    def __init__(self, trips, rows, rows_in_trip):
+        """
+        Parameters:
+            trips (pd.DataFrame): 'TripKey' (see pack_trip_key), 'ContainerID', 'TripID', 'DayTrip' (duration),
+                                  'IsLost' and 'IsRecollected' of each trip, sorted by container and trip.
+            rows (int): Number of rows of the panel.
+            rows_in_trip (int): Number of rows of the panel with a StartingDate.
+        """
+        self.trips = trips
+        self.rows = rows
+        self.rows_in_trip = rows_in_trip
+
+
+def aggregate_panel_trips(df, strata=None):
+    """
+    Collapses a panel to one row per trip in a single groupby over the packed trip key.
+
+    Parameters:
+        df (pd.DataFrame): Panel (or chunk of panel) of simulated container data.
+        strata (list of str, optional): Columns to keep, with their value at the start of the trip.
+
+    Returns:
+        TripAggregate: The trips of the panel.
+    """
+    strata = list(strata or [])
+    in_trip = df["StartingDate"].notnull()
+    data = df.loc[in_trip, ["DayTrip", "IsLost"] + strata]
+    data["IsRecollected"] = df["RecollectingDate"].notnull().to_numpy()[in_trip.to_numpy()].astype(np.int8)
+    trip_key = pack_trip_key(df["ContainerID"].to_numpy()[in_trip], df["TripID"].to_numpy()[in_trip])
+
+    groupby_trip = data.groupby(trip_key, sort=True)
+    trips = groupby_trip[["DayTrip", "IsLost", "IsRecollected"]].max()
+    for column in strata:
+        trips[column] = groupby_trip[column].first()
+
+    container_id, trip_id = unpack_trip_key(trips.index)
+    trips.insert(0, "TripKey", trips.index.to_numpy())
+    trips.insert(1, "ContainerID", container_id.astype(df["ContainerID"].dtype))
+    trips.insert(2, "TripID", trip_id.astype(df["TripID"].dtype))
+    trips = trips.dropna(subset=["DayTrip", "IsLost"]).reset_index(drop=True)
+
+    return TripAggregate(trips, rows=len(df), rows_in_trip=int(in_trip.sum()))